@@ -1,9 +1,16 @@
 import streamlit as st
+import os
+import re
 import json
 import logging
 import time
+import uuid
+import itertools
+from collections import deque
 from datetime import datetime
-from chatbot import TalentScoutChatbot
+from typing import Dict, List, Optional, Tuple
+import chatbot
+from chatbot import TalentScoutChatbot, DEFAULT_MODEL
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +24,182 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# UI view of the chatbot state before the first message. Copy it with a
+# fresh 'collected_data' dict rather than sharing the nested mutable
+_INITIAL_STATE = {
+    'step': 'greeting',
+    'collected_data': {},
+    'current_question_index': 0,
+    'total_questions': 0,
+    'is_complete': False
+}
+
+# Ollama model used by the chatbot and the startup warm-up
+OLLAMA_MODEL = DEFAULT_MODEL
+
+# Chat messages rendered per rerun; older ones load on demand
+MAX_VISIBLE = 50
+
+# Messages kept in the live chat; the full transcript is kept for export
+HISTORY_CAP = 200
+
+# Phrases in a bot reply that mean the conversation has ended
+_END_RE = re.compile(r'\b(have a great day|goodbye)\b', re.IGNORECASE)
+
+# Tech stack categories shown in the sidebar
+CATEGORIES = {
+    'Languages': ['python', 'java', 'javascript', 'typescript', 'c++', 'go', 'rust'],
+    'Frameworks': ['django', 'react', 'angular', 'vue', 'flask', 'spring', 'express'],
+    'Databases': ['postgresql', 'mysql', 'mongodb', 'redis', 'cassandra'],
+    'Tools': ['docker', 'kubernetes', 'aws', 'git', 'jenkins', 'terraform']
+}
+
+# Static HTML is built once at import. Streamlit still needs it emitted on
+# every rerun, otherwise the element is dropped from the page
+_CSS_BLOCK = """
+<style>
+.main-title {
+    text-align: center;
+    color: #1E3A8A;
+    font-size: 2.5rem;
+    font-weight: bold;
+    margin-bottom: 0.5rem;
+}
+.sub-title {
+    text-align: center;
+    color: #64748B;
+    font-size: 1.1rem;
+    margin-bottom: 2rem;
+}
+.highlight-box {
+    background-color: #F0F9FF;
+    border-left: 4px solid #3B82F6;
+    padding: 1rem;
+    border-radius: 0.5rem;
+    margin: 1rem 0;
+}
+</style>
+"""
+
+_FOOTER_HTML = """
+<div style='text-align: center; color: #64748B; padding: 1rem; font-size: 0.9rem;'>
+    <p><strong>Powered by Llama 3.2 via Ollama</strong> | Built with Streamlit</p>
+    <p style='font-size: 0.8rem;'>© 2024 TalentScout Recruitment. All rights reserved.</p>
+    <p style='font-size: 0.75rem; margin-top: 0.5rem;'>
+        This chatbot uses AI to generate contextual technical questions based on your declared tech stack.<br>
+        All responses are confidential and reviewed by our recruitment team.
+    </p>
+</div>
+"""
+
+# Reverse index so each tech stack token is categorized with one dict lookup
+_KEYWORD_TO_CAT = {kw: cat for cat, kws in CATEGORIES.items() for kw in kws}
+
+# Version and js suffixes stripped from a token that misses the index
+# ("python3" -> "python", "reactjs" -> "react")
+_TOKEN_SUFFIX_RE = re.compile(r'(?:js|\d+(?:\.\d+)*)$')
+
+
+def _token_category(token: str) -> Optional[str]:
+    """Return the category of one tech stack token, or None"""
+    category = _KEYWORD_TO_CAT.get(token)
+    if category is None:
+        category = _KEYWORD_TO_CAT.get(_TOKEN_SUFFIX_RE.sub('', token))
+    return category
+
+
+def _truncate(s: str, n: int) -> str:
+    """Shorten s to n characters, marking the cut with an ellipsis"""
+    return f"{s[:n]}…" if len(s) > n else s
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _parse_tech_stack(raw: str) -> Tuple[Dict[str, List[str]], List[str]]:
+    """
+    Split a raw tech stack string and group items by category.
+    Cached on the raw string so sidebar reruns don't re-parse it.
+    """
+    categorized = {cat: [] for cat in CATEGORIES}
+    uncategorized = []
+    
+    # Split tech stack, lowercasing each item once
+    items = [(item, item.lower()) for item in (raw_item.strip() for raw_item in raw.replace('\n', ',').split(',')) if item]
+    
+    for item, item_lower in items:
+        # Match whole tokens ("React.js" -> "react", "js"; "Kubernetes(k8s)" -> "kubernetes", "k8s")
+        tokens = re.split(r'[\s\-_./()]+', item_lower)
+        category = next(filter(None, map(_token_category, tokens)), None)
+        
+        if category:
+            categorized[category].append(item)
+        else:
+            uncategorized.append(item)
+    
+    return categorized, uncategorized
+
+
+@st.cache_resource(max_entries=1024, show_spinner=False)
+def _render_markdown(msg_id: str, _body: str) -> str:
+    """
+    Prepare a chat message body for st.markdown, memoized per message id.
+    Messages are immutable once added, so the body isn't hashed, and
+    cache_resource returns the string as is instead of unpickling a copy.
+    No preprocessing is needed yet, so the body is returned unchanged; it
+    must match what st.write_stream showed while the reply streamed in.
+    """
+    return _body
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _serialize_export(payload_key: str, _payload: Dict) -> str:
+    """
+    Serialize an export payload, memoized on payload_key.
+    The leading underscore keeps Streamlit from hashing the payload itself,
+    so the key must change whenever the payload does.
+    """
+    return json.dumps(_payload, indent=2)
+
+
+@st.cache_resource(ttl=60, show_spinner=False)
+def _ollama_healthy() -> Tuple[bool, str]:
+    """
+    Check the Ollama daemon at most once a minute per process
+    rather than on every rerun
+    """
+    try:
+        import ollama
+        ollama.list()
+        return True, ""
+    except Exception as e:
+        logger.warning(f"⚠️ Ollama health check failed: {e}")
+        return False, str(e)
+
+
+@st.cache_resource(ttl=60, show_spinner="Loading the language model...")
+def _warm_ollama() -> bool:
+    """
+    Load the model and evaluate the system prompt once per process so the
+    first candidate message doesn't pay the cold-start cost. A failure is
+    retried after the TTL; once warm, the call returns immediately.
+    """
+    start = time.perf_counter()
+    warmed = chatbot._warm_prompt_prefix(OLLAMA_MODEL)
+    if warmed:
+        logger.info(f"🔥 Model warm-up took {time.perf_counter() - start:.1f}s")
+    return warmed
+
+
+@st.cache_resource(ttl=60, show_spinner=False)
+def _get_llm_available() -> bool:
+    """
+    Probe Ollama at most once a minute per process, like the health check,
+    and share the result across sessions. Only process-wide, read-only facts
+    belong in this cache: the chatbot itself holds the candidate's
+    conversation, so each session keeps its own instance in st.session_state.
+    """
+    return chatbot._llm_available(OLLAMA_MODEL)
+
+
 class ChatInterface:
     def __init__(self):
         self.initialize_session_state()
@@ -25,50 +208,63 @@ class ChatInterface:
         """Initialize all session state variables"""
         if 'chatbot' not in st.session_state:
             try:
-                st.session_state.chatbot = TalentScoutChatbot()
-                logger.info("✅ Chatbot initialized successfully with Llama2")
+                st.session_state.chatbot = TalentScoutChatbot(
+                    llm_available=_get_llm_available(),
+                    model=OLLAMA_MODEL
+                )
+                logger.info(f"✅ Chatbot initialized successfully with {OLLAMA_MODEL}")
             except Exception as e:
                 logger.error(f"❌ Error initializing chatbot: {e}")
-                st.error("Failed to initialize chatbot. Please ensure Ollama is running with llama2 model.")
-                st.info("Run: `ollama pull llama2` to install the model")
+                st.error(f"Failed to initialize chatbot. Please ensure Ollama is running with the {OLLAMA_MODEL} model.")
+                st.info(f"Run: `ollama pull {OLLAMA_MODEL}` to install the model")
                 st.stop()
         
         if 'messages' not in st.session_state:
-            st.session_state.messages = []
+            st.session_state.messages = deque(maxlen=HISTORY_CAP)
+            st.session_state.full_history = []
             self.add_bot_message(st.session_state.chatbot.get_greeting())
         
         if 'conversation_active' not in st.session_state:
             st.session_state.conversation_active = True
         
         if 'state_info' not in st.session_state:
-            st.session_state.state_info = {
-                'step': 'greeting',
-                'collected_data': {},
-                'current_question_index': 0,
-                'total_questions': 0,
-                'is_complete': False
-            }
+            st.session_state.state_info = {**_INITIAL_STATE, 'collected_data': {}}
         
         if 'session_start_time' not in st.session_state:
             st.session_state.session_start_time = datetime.now()
     
     def add_bot_message(self, message):
         """Add a bot message to the chat history"""
-        st.session_state.messages.append(("assistant", message))
+        entry = {"id": uuid.uuid4().hex, "role": "assistant", "content": message}
+        st.session_state.messages.append(entry)
+        st.session_state.full_history.append(entry)
     
     def add_user_message(self, message):
         """Add a user message to the chat history"""
-        st.session_state.messages.append(("user", message))
+        entry = {"id": uuid.uuid4().hex, "role": "user", "content": message}
+        st.session_state.messages.append(entry)
+        st.session_state.full_history.append(entry)
     
+    @st.fragment
     def display_chat_messages(self):
-        """Display all chat messages maintaining conversation context"""
-        for speaker, message in st.session_state.messages:
-            if speaker == "assistant":
+        """Display the most recent chat messages maintaining conversation context"""
+        msgs = st.session_state.messages
+        start = max(0, len(msgs) - st.session_state.get('visible_window', MAX_VISIBLE))
+        
+        # Only the window is rendered; the capped deque bounds how far back it goes
+        if start > 0:
+            if st.button(f"⬆️ Load earlier messages ({start} hidden)", use_container_width=True):
+                st.session_state.visible_window = st.session_state.get('visible_window', MAX_VISIBLE) + MAX_VISIBLE
+                st.rerun(scope="fragment")
+        
+        for message in itertools.islice(msgs, start, None):
+            body = _render_markdown(message["id"], message["content"])
+            if message["role"] == "assistant":
                 with st.chat_message("assistant", avatar="🤖"):
-                    st.markdown(message)
+                    st.markdown(body)
             else:
                 with st.chat_message("user", avatar="👤"):
-                    st.markdown(message)
+                    st.markdown(body)
     
     def handle_user_input(self, user_input):
         """
@@ -80,43 +276,62 @@ class ChatInterface:
         
         # Add user message to chat
         self.add_user_message(user_input)
+        user_message = st.session_state.messages[-1]
+        with st.chat_message("user", avatar="👤"):
+            st.markdown(_render_markdown(user_message["id"], user_message["content"]))
         
         try:
-            # Get bot response with context handling
-            bot_response, state_info = st.session_state.chatbot.process_message(user_input)
-            
-            # Update state info for UI
-            st.session_state.state_info = state_info
-            
-            # Add bot response to chat
-            self.add_bot_message(bot_response)
-            
-            # Check if conversation completed or ended
-            if state_info.get('is_complete', False):
-                st.session_state.conversation_active = False
-                logger.info("✅ Screening completed successfully")
-            elif any(word in bot_response.lower() for word in ['have a great day', 'goodbye']):
-                st.session_state.conversation_active = False
-                logger.info("👋 Conversation ended by user")
+            # Stream the bot response with context handling; state updates
+            # happen once the stream completes
+            with st.chat_message("assistant", avatar="🤖"):
+                st.write_stream(st.session_state.chatbot.stream_message(user_input))
+        except Exception as e:
+            logger.error(f"❌ Error streaming message: {e}")
         
+        self.record_turn()
+    
+    def record_turn(self):
+        """
+        Add the reply of the chatbot's last turn to the chat and update the
+        UI state. New input reruns the script and interrupts st.write_stream,
+        but the turn still finishes on the background loop, so every run
+        starts by recording a turn the previous run left behind.
+        """
+        try:
+            turn = st.session_state.chatbot.collect_turn()
         except Exception as e:
             logger.error(f"❌ Error processing message: {e}")
             error_message = "⚠️ I encountered an error. Please try rephrasing your response or type 'bye' to exit."
             self.add_bot_message(error_message)
+            return
+        
+        if turn is None:
+            return
+        bot_response, state_info = turn
+        
+        # Update state info for UI
+        st.session_state.state_info = state_info
+        
+        # Add bot response to chat
+        self.add_bot_message(bot_response)
+        
+        # Check if conversation completed or ended
+        if state_info.get('is_complete', False):
+            st.session_state.conversation_active = False
+            logger.info("✅ Screening completed successfully")
+        elif _END_RE.search(bot_response) is not None:
+            st.session_state.conversation_active = False
+            logger.info("👋 Conversation ended by user")
     
     def reset_conversation(self):
         """Reset the conversation to start fresh"""
         try:
             st.session_state.chatbot.reset_conversation()
-            st.session_state.messages = []
+            st.session_state.messages = deque(maxlen=HISTORY_CAP)
+            st.session_state.full_history = []
+            st.session_state.visible_window = MAX_VISIBLE
             st.session_state.conversation_active = True
-            st.session_state.state_info = {
-                'step': 'greeting',
-                'collected_data': {},
-                'current_question_index': 0,
-                'total_questions': 0,
-                'is_complete': False
-            }
+            st.session_state.state_info = {**_INITIAL_STATE, 'collected_data': {}}
             st.session_state.session_start_time = datetime.now()
             self.add_bot_message(st.session_state.chatbot.get_greeting())
             logger.info("🔄 Conversation reset to initial state")
@@ -124,241 +339,214 @@ class ChatInterface:
             logger.error(f"❌ Error resetting conversation: {e}")
             st.error("Failed to reset. Please refresh the page.")
     
-    def export_data_as_json(self):
+    def export_data_as_json(self, collected_data):
         """Export collected data as JSON for recruitment team"""
-        collected_data = st.session_state.chatbot.get_collected_data()
+        completion_status = 'Complete' if st.session_state.state_info.get('is_complete') else 'Incomplete'
         
         # Add metadata
         export_data = {
             'metadata': {
                 'screening_date': st.session_state.session_start_time.strftime("%Y-%m-%d %H:%M:%S"),
-                'completion_status': 'Complete' if st.session_state.state_info.get('is_complete') else 'Incomplete',
+                'completion_status': completion_status,
                 'total_questions': len(collected_data['questions_asked']),
                 'answered_questions': len(collected_data['technical_answers'])
             },
-            'candidate_data': collected_data
+            'candidate_data': collected_data,
+            'transcript': [
+                {'role': entry['role'], 'content': entry['content']}
+                for entry in st.session_state.full_history
+            ]
         }
         
-        return json.dumps(export_data, indent=2)
+        # Collected data only ever grows within a session, so these counts
+        # identify the payload without hashing its contents
+        payload_key = (
+            f"{st.session_state.session_start_time.isoformat()}:"
+            f"{len(collected_data['personal_info'])}:"
+            f"{len(collected_data['questions_asked'])}:"
+            f"{len(collected_data['technical_answers'])}:"
+            f"{len(st.session_state.full_history)}:"
+            f"{completion_status}"
+        )
+        
+        return _serialize_export(payload_key, export_data)
     
     def render_sidebar(self):
         """Render sidebar with candidate info, progress, and controls"""
         with st.sidebar:
-            st.markdown("# 🎯 TalentScout AI")
-            st.caption("Technical Screening Assistant")
-            st.caption("*Powered by Llama2 via Ollama*")
+            self._sidebar_fragment()
+    
+    @st.fragment
+    def _sidebar_fragment(self):
+        """
+        Sidebar body as a fragment: its own widgets rerun only this function,
+        not the chat. Full-app reruns still redraw it.
+        """
+        # One snapshot of the candidate data per rerun
+        collected_data = st.session_state.chatbot.get_collected_data()
+        
+        st.markdown("# 🎯 TalentScout AI")
+        st.caption("Technical Screening Assistant")
+        st.caption("*Powered by Llama 3.2 via Ollama*")
+        st.caption(f"Model: `{OLLAMA_MODEL}`")
+        st.markdown("---")
+        
+        # Conversation controls
+        st.subheader("⚙️ Controls")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if st.button("🔄 New", use_container_width=True, help="Start a new screening"):
+                self.reset_conversation()
+                st.rerun(scope="app")
+        
+        with col2:
+            if collected_data['personal_info'] or collected_data['technical_answers']:
+                if st.button("💾 Export", use_container_width=True, help="Export candidate data"):
+                    st.session_state.show_export = True
+        
+        # Export modal
+        if hasattr(st.session_state, 'show_export') and st.session_state.show_export:
+            st.markdown("---")
+            with st.expander("📋 Export Candidate Data", expanded=True):
+                json_data = self.export_data_as_json(collected_data)
+                
+                candidate_name = st.session_state.state_info['collected_data'].get('full_name', 'candidate')
+                filename = f"screening_{candidate_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.json"
+                
+                st.download_button(
+                    label="📥 Download JSON",
+                    data=json_data,
+                    file_name=filename,
+                    mime="application/json",
+                    use_container_width=True
+                )
+                
+                # Only build the code view when asked for
+                if st.toggle("View Data", key="show_export_data"):
+                    st.code(json_data, language="json")
+                
+                if st.button("✖️ Close", use_container_width=True):
+                    st.session_state.show_export = False
+                    st.rerun(scope="fragment")
+        
+        st.markdown("---")
+        
+        # Candidate Profile Section
+        st.subheader("👤 Candidate Profile")
+        
+        if collected_data['personal_info']:
+            personal_info = collected_data['personal_info']
+            
+            # Candidate name
+            if 'full_name' in personal_info:
+                st.markdown(f"### {personal_info['full_name']}")
+                st.caption(f"Screening started: {st.session_state.session_start_time.strftime('%I:%M %p')}")
+            
+            # Contact information
+            if 'email' in personal_info:
+                st.text(f"✉️ {personal_info['email']}")
+            
+            if 'phone' in personal_info:
+                st.text(f"📞 {personal_info['phone']}")
+            
             st.markdown("---")
             
-            # Conversation controls
-            st.subheader("⚙️ Controls")
+            # Professional details
+            if 'desired_position' in personal_info:
+                st.info(f"**🎯 Position:** {personal_info['desired_position']}")
             
             col1, col2 = st.columns(2)
             
             with col1:
-                if st.button("🔄 New", use_container_width=True, help="Start a new screening"):
-                    self.reset_conversation()
-                    st.rerun()
+                if 'years_experience' in personal_info:
+                    st.metric("Experience", f"{personal_info['years_experience']} yrs")
             
             with col2:
-                collected_data = st.session_state.chatbot.get_collected_data()
-                if collected_data['personal_info'] or collected_data['technical_answers']:
-                    if st.button("💾 Export", use_container_width=True, help="Export candidate data"):
-                        st.session_state.show_export = True
+                if 'current_location' in personal_info:
+                    st.metric("Location", _truncate(personal_info['current_location'], 12))
             
-            # Export modal
-            if hasattr(st.session_state, 'show_export') and st.session_state.show_export:
+            # Tech Stack - Prominently displayed as per requirements
+            if 'tech_stack' in personal_info:
                 st.markdown("---")
-                with st.expander("📋 Export Candidate Data", expanded=True):
-                    json_data = self.export_data_as_json()
-                    
-                    candidate_name = st.session_state.state_info['collected_data'].get('full_name', 'candidate')
-                    filename = f"screening_{candidate_name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.json"
+                st.subheader("💻 Tech Stack")
+                with st.expander("View Technologies", expanded=True):
+                    # Parse and display as organized list
+                    categorized, uncategorized = _parse_tech_stack(personal_info['tech_stack'])
                     
-                    st.download_button(
-                        label="📥 Download JSON",
-                        data=json_data,
-                        file_name=filename,
-                        mime="application/json",
-                        use_container_width=True
-                    )
+                    # Display categorized
+                    for category, items_list in categorized.items():
+                        if items_list:
+                            st.markdown(f"**{category}:**")
+                            st.markdown(", ".join([f"`{item}`" for item in items_list]))
                     
-                    with st.expander("View Data"):
-                        st.code(json_data, language="json")
-                    
-                    if st.button("✖️ Close", use_container_width=True):
-                        st.session_state.show_export = False
-                        st.rerun()
-            
-            st.markdown("---")
+                    if uncategorized:
+                        st.markdown("**Other:**")
+                        st.markdown(", ".join([f"`{item}`" for item in uncategorized]))
             
-            # Candidate Profile Section
-            st.subheader("👤 Candidate Profile")
-            collected_data = st.session_state.chatbot.get_collected_data()
+            # Progress indicator
+            total_questions = len(collected_data['questions_asked'])
+            answered_questions = len(collected_data['technical_answers'])
             
-            if collected_data['personal_info']:
-                personal_info = collected_data['personal_info']
-                
-                # Candidate name
-                if 'full_name' in personal_info:
-                    st.markdown(f"### {personal_info['full_name']}")
-                    st.caption(f"Screening started: {st.session_state.session_start_time.strftime('%I:%M %p')}")
-                
-                # Contact information
-                if 'email' in personal_info:
-                    st.text(f"✉️ {personal_info['email']}")
-                
-                if 'phone' in personal_info:
-                    st.text(f"📞 {personal_info['phone']}")
-                
+            if total_questions > 0:
                 st.markdown("---")
+                st.subheader("📊 Progress")
                 
-                # Professional details
-                if 'desired_position' in personal_info:
-                    st.info(f"**🎯 Position:** {personal_info['desired_position']}")
-                
-                col1, col2 = st.columns(2)
+                progress = answered_questions / total_questions
+                st.progress(progress)
+                st.caption(f"Questions: {answered_questions}/{total_questions}")
                 
-                with col1:
-                    if 'years_experience' in personal_info:
-                        st.metric("Experience", f"{personal_info['years_experience']} yrs")
-                
-                with col2:
-                    if 'current_location' in personal_info:
-                        location = personal_info['current_location']
-                        display_location = location[:12] + "..." if len(location) > 12 else location
-                        st.metric("Location", display_location)
-                
-                # Tech Stack - Prominently displayed as per requirements
-                if 'tech_stack' in personal_info:
-                    st.markdown("---")
-                    st.subheader("💻 Tech Stack")
-                    with st.expander("View Technologies", expanded=True):
-                        tech_stack = personal_info['tech_stack']
-                        
-                        # Parse and display as organized list
-                        categories = {
-                            'Languages': ['python', 'java', 'javascript', 'typescript', 'c++', 'go', 'rust'],
-                            'Frameworks': ['django', 'react', 'angular', 'vue', 'flask', 'spring', 'express'],
-                            'Databases': ['postgresql', 'mysql', 'mongodb', 'redis', 'cassandra'],
-                            'Tools': ['docker', 'kubernetes', 'aws', 'git', 'jenkins', 'terraform']
-                        }
-                        
-                        tech_lower = tech_stack.lower()
-                        categorized = {cat: [] for cat in categories}
-                        uncategorized = []
-                        
-                        # Split tech stack
-                        items = [item.strip() for item in tech_stack.replace('\n', ',').split(',')]
-                        
-                        for item in items:
-                            if not item:
-                                continue
-                            
-                            categorized_flag = False
-                            for category, keywords in categories.items():
-                                if any(keyword in item.lower() for keyword in keywords):
-                                    categorized[category].append(item)
-                                    categorized_flag = True
-                                    break
-                            
-                            if not categorized_flag:
-                                uncategorized.append(item)
-                        
-                        # Display categorized
-                        for category, items_list in categorized.items():
-                            if items_list:
-                                st.markdown(f"**{category}:**")
-                                st.markdown(", ".join([f"`{item}`" for item in items_list]))
+                # Completion status
+                if st.session_state.state_info.get('is_complete', False):
+                    st.success("✅ Screening Complete!")
+                elif answered_questions > 0:
+                    remaining = total_questions - answered_questions
+                    st.info(f"🔄 In Progress ({remaining} remaining)")
+                else:
+                    st.warning("⏳ Starting technical assessment...")
+            
+            # Technical questions and answers
+            if collected_data['technical_answers']:
+                st.markdown("---")
+                # Only render the Q&A list while the toggle is on
+                if st.toggle(f"📝 Answers ({len(collected_data['technical_answers'])})", key="show_answers"):
+                    for i, (question, answer) in enumerate(collected_data['technical_answers'].items(), 1):
+                        st.markdown(f"**Q{i}:** {question}")
                         
-                        if uncategorized:
-                            st.markdown("**Other:**")
-                            st.markdown(", ".join([f"`{item}`" for item in uncategorized]))
-                
-                # Progress indicator
-                total_questions = len(collected_data['questions_asked'])
-                answered_questions = len(collected_data['technical_answers'])
-                
-                if total_questions > 0:
-                    st.markdown("---")
-                    st.subheader("📊 Progress")
-                    
-                    progress = answered_questions / total_questions
-                    st.progress(progress)
-                    st.caption(f"Questions: {answered_questions}/{total_questions}")
-                    
-                    # Completion status
-                    if st.session_state.state_info.get('is_complete', False):
-                        st.success("✅ Screening Complete!")
-                    elif answered_questions > 0:
-                        remaining = total_questions - answered_questions
-                        st.info(f"🔄 In Progress ({remaining} remaining)")
-                    else:
-                        st.warning("⏳ Starting technical assessment...")
-                
-                # Technical questions and answers
-                if collected_data['technical_answers']:
-                    st.markdown("---")
-                    with st.expander(f"📝 Answers ({len(collected_data['technical_answers'])})", expanded=False):
-                        for i, (question, answer) in enumerate(collected_data['technical_answers'].items(), 1):
-                            st.markdown(f"**Q{i}:** {question}")
-                            
-                            # Show truncated answer
-                            if len(answer) > 150:
-                                with st.expander(f"View Answer {i}"):
-                                    st.markdown(f"*{answer}*")
-                            else:
+                        # Show truncated answer
+                        if len(answer) > 150:
+                            with st.expander(f"View Answer {i}"):
                                 st.markdown(f"*{answer}*")
-                            
-                            if i < len(collected_data['technical_answers']):
-                                st.markdown("---")
-            
-            else:
-                st.info("💡 No data collected yet.\n\nStart the conversation to begin screening!")
+                        else:
+                            st.markdown(f"*{answer}*")
+                        
+                        if i < len(collected_data['technical_answers']):
+                            st.markdown("---")
+        
+        else:
+            st.info("💡 No data collected yet.\n\nStart the conversation to begin screening!")
+        
+        st.markdown("---")
+        
+        # System status
+        if st.toggle("🔧 System Info", key="show_system_info"):
+            state = st.session_state.state_info
             
-            st.markdown("---")
+            status_data = {
+                "Current Step": state.get('step', 'unknown').replace('_', ' ').title(),
+                "Active": "✅ Yes" if st.session_state.conversation_active else "❌ No",
+                "Complete": "✅ Yes" if state.get('is_complete', False) else "⏳ In Progress",
+                "Questions": f"{state.get('current_question_index', 0)}/{state.get('total_questions', 0)}",
+                # Server-side concurrency limit for the async Ollama calls
+                "Ollama Parallel": os.environ.get('OLLAMA_NUM_PARALLEL', 'default')
+            }
             
-            # System status
-            with st.expander("🔧 System Info"):
-                state = st.session_state.state_info
-                
-                status_data = {
-                    "Current Step": state.get('step', 'unknown').replace('_', ' ').title(),
-                    "Active": "✅ Yes" if st.session_state.conversation_active else "❌ No",
-                    "Complete": "✅ Yes" if state.get('is_complete', False) else "⏳ In Progress",
-                    "Questions": f"{state.get('current_question_index', 0)}/{state.get('total_questions', 0)}"
-                }
-                
-                for key, value in status_data.items():
-                    st.text(f"{key}: {value}")
-    
+            for key, value in status_data.items():
+                st.text(f"{key}: {value}")
+
     def render_main_interface(self):
         """Render the main chat interface"""
-        # Custom CSS
-        st.markdown("""
-        <style>
-        .main-title {
-            text-align: center;
-            color: #1E3A8A;
-            font-size: 2.5rem;
-            font-weight: bold;
-            margin-bottom: 0.5rem;
-        }
-        .sub-title {
-            text-align: center;
-            color: #64748B;
-            font-size: 1.1rem;
-            margin-bottom: 2rem;
-        }
-        .highlight-box {
-            background-color: #F0F9FF;
-            border-left: 4px solid #3B82F6;
-            padding: 1rem;
-            border-radius: 0.5rem;
-            margin: 1rem 0;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-        
         # Header
         st.markdown('<h1 class="main-title">🤖 TalentScout AI Assistant</h1>', unsafe_allow_html=True)
         st.markdown('<p class="sub-title">Technical Screening with AI-Generated Questions</p>', unsafe_allow_html=True)
@@ -440,7 +628,7 @@ class ChatInterface:
             st.markdown("""
             ### 🤖 AI-Generated Technical Questions
             
-            Based on YOUR specific tech stack, our AI (Llama2) will generate **3-5 tailored questions** to assess:
+            Based on YOUR specific tech stack, our AI (Llama 3.2) will generate **3-5 tailored questions** to assess:
             
             - **Proficiency** in each declared technology
             - **Practical experience** and problem-solving
@@ -487,19 +675,14 @@ class ChatInterface:
     def render_footer(self):
         """Render footer with attribution"""
         st.markdown("---")
-        st.markdown("""
-        <div style='text-align: center; color: #64748B; padding: 1rem; font-size: 0.9rem;'>
-            <p><strong>Powered by Llama2 via Ollama</strong> | Built with Streamlit</p>
-            <p style='font-size: 0.8rem;'>© 2024 TalentScout Recruitment. All rights reserved.</p>
-            <p style='font-size: 0.75rem; margin-top: 0.5rem;'>
-                This chatbot uses AI to generate contextual technical questions based on your declared tech stack.<br>
-                All responses are confidential and reviewed by our recruitment team.
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_FOOTER_HTML, unsafe_allow_html=True)
     
     def run(self):
         """Main method to run the application"""
+        # Custom CSS
+        st.markdown(_CSS_BLOCK, unsafe_allow_html=True)
+        
+        self.record_turn()
         self.render_sidebar()
         self.render_main_interface()
         self.render_instructions()
@@ -510,12 +693,12 @@ def main():
     """Main application entry point"""
     try:
         # Display ollama check warning if needed
-        try:
-            import ollama
-            ollama.list()
-        except Exception as e:
+        ok, err = _ollama_healthy()
+        if not ok:
             st.warning("⚠️ Ollama connection issue detected. Questions will use fallback mode.")
-            st.info("Ensure Ollama is running: `ollama serve` and model is installed: `ollama pull llama2`")
+            st.info(f"Ensure Ollama is running: `ollama serve` and model is installed: `ollama pull {OLLAMA_MODEL}`")
+        else:
+            _warm_ollama()
         
         # Initialize and run the chat interface
         chat_interface = ChatInterface()
@@ -525,12 +708,12 @@ def main():
         st.error(f"❌ Application Error: {e}")
         logger.error(f"Application error: {e}", exc_info=True)
         
-        st.markdown("""
+        st.markdown(f"""
         ### 🔧 Troubleshooting
         
         **Please ensure:**
         1. Ollama is installed and running: `ollama serve`
-        2. Llama2 model is downloaded: `ollama pull llama2`
+        2. The model is downloaded: `ollama pull {OLLAMA_MODEL}`
         3. Python dependencies are installed: `pip install streamlit ollama`
         
         **Then refresh this page.**
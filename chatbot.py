@@ -1,22 +1,285 @@
+import os
 import re
 import json
+import sqlite3
+import hashlib
+import time
+import queue
+import asyncio
+import threading
+import concurrent.futures
 import ollama
-from typing import Dict, List, Any, Tuple, Optional
+from collections import deque
+from dataclasses import dataclass
+from contextlib import closing
+from typing import Dict, List, Any, Tuple, Optional, Callable, Iterator, Set
 import logging
+from semantic_cache import SemanticCache
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Llama 3.2 3B instruct at 4-bit (Q4_K_M): roughly half the memory traffic
+# per token of the 7B Llama2 chat model, with screening-grade answer quality.
+# Override with the TS_MODEL environment variable
+DEFAULT_MODEL = os.getenv('TS_MODEL', 'llama3.2:3b-instruct-q4_K_M')
+
+# Validation regexes, compiled once at import
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_PHONE_RE = re.compile(r'^[\+]?[0-9\s\-\(\)]{10,}$')
+_YEARS_RE = re.compile(r'^\d+\.?\d*$')
+
+# Per-field validation rules for the information collection step
+_FIELD_VALIDATIONS = {
+    'email': {
+        'pattern': _EMAIL_RE,
+        'message': "it doesn't appear to be a valid email format"
+    },
+    'phone': {
+        'pattern': _PHONE_RE,
+        'message': "it should be a valid phone number with at least 10 digits"
+    },
+    'years_experience': {
+        'pattern': _YEARS_RE,
+        'message': "it should be a number (e.g., 5 or 3.5)"
+    },
+    'full_name': {
+        'min_length': 2,
+        'message': "it seems too short for a full name"
+    },
+    'tech_stack': {
+        'min_length': 10,
+        'message': "it needs more detail on the languages, frameworks, databases and tools you use"
+    }
+}
+
+# Any of these as a standalone word ends the conversation
+_EXIT_WORDS = frozenset({'bye', 'exit', 'quit', 'goodbye', 'stop', 'end'})
+
+# Technologies recognised in a candidate's tech stack. One alternation
+# scans the text in a single pass; whole words only (so 'java' doesn't
+# match inside 'javascript'), with an optional js suffix ('Node.js', 'reactjs'),
+# version ('Python3', 'java8', 'python3.11') or hub/lab suffix ('GitHub', 'DockerHub')
+_TECH_KEYWORDS = ['python', 'java', 'javascript', 'typescript', 'react', 'angular', 
+                  'vue', 'django', 'flask', 'spring', 'node', 'postgresql', 'mysql', 
+                  'mongodb', 'redis', 'docker', 'kubernetes', 'aws', 'azure', 'git']
+_TECH_RE = re.compile(r'\b(' + '|'.join(map(re.escape, _TECH_KEYWORDS)) + r')(?:\.?js|\d+(?:\.\d+)*|hub|lab)?\b', re.IGNORECASE)
+
+# Off-topic detection: messages opening with a question word, and the
+# screening topics that keep such a question on-topic (substring match)
+_Q_WORDS = ('what', 'who', 'how', 'why', 'when', 'where', 'can', 'could', 'would')
+_INFO_RE = re.compile(r'name|email|phone|experience|position|location|tech|skill')
+
+# One generated question line; the payload excludes numbering, bullets
+# and surrounding whitespace
+_QUESTION_LINE_RE = re.compile(r'^[ \t]*(?:\d+[.):][ \t]*)?(?:[-•*][ \t]*)?(.+?)\s*$', re.M)
+
+# On-disk cache of generated technical questions, keyed by tech stack
+QUESTION_CACHE_PATH = 'tq_cache.db'
+
+
+def _load_cached_questions(key: str) -> Optional[List[str]]:
+    """Return the cached questions for key, or None on a miss"""
+    try:
+        with closing(sqlite3.connect(QUESTION_CACHE_PATH)) as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS questions (key TEXT PRIMARY KEY, questions TEXT)')
+            row = conn.execute('SELECT questions FROM questions WHERE key = ?', (key,)).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Question cache read failed: {e}")
+        return None
+    
+    return json.loads(row[0]) if row else None
+
+
+def _store_cached_questions(key: str, questions: List[str]):
+    """Persist generated questions under key"""
+    try:
+        with closing(sqlite3.connect(QUESTION_CACHE_PATH)) as conn, conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS questions (key TEXT PRIMARY KEY, questions TEXT)')
+            conn.execute('INSERT OR REPLACE INTO questions (key, questions) VALUES (?, ?)',
+                         (key, json.dumps(questions)))
+    except sqlite3.Error as e:
+        logger.warning(f"Question cache write failed: {e}")
+
+
+# How long Ollama keeps the model (and its cached prompt prefix) loaded
+# between requests
+KEEP_ALIVE = '30m'
+
+# Context window requested on every Ollama call (num_ctx) and the share of
+# it kept free for the system prompt, the per-turn context and the reply.
+# Conversation history gets whatever is left, so every prompt fits; the
+# completion message skips the history and spends that share on the answers
+# instead. num_ctx is sent explicitly and never varies per call: Ollama reloads the model when
+# num_ctx changes, which would also discard the cached prompt prefix.
+MAX_CTX = 2048
+RESERVED_TOKENS = 1024
+HISTORY_TOKEN_BUDGET = MAX_CTX - RESERVED_TOKENS
+# Hard cap on history length regardless of token budget
+MAX_HISTORY_MESSAGES = 30
+
+
+def _approx_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+def _clip(text: str, max_chars: int) -> str:
+    """Shorten text to at most max_chars, marking the cut with an ellipsis"""
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1].rstrip() + '…'
+
+
+# Embedding model for the semantic response cache, and the cache size.
+# Each chatbot keeps its own cache, cleared on reset, because cached replies
+# are generated from the candidate's message and may repeat their details.
+# Only the greeting and off-topic questions are cached: the context must
+# match exactly, only the candidate's message is compared by embedding, and
+# those replies are generated without history.
+EMBED_MODEL = 'nomic-embed-text'
+RESPONSE_CACHE_ENTRIES = 64
+
+# Streaming replies are flushed to the UI in batches rather than per token
+STREAM_FLUSH_INTERVAL = 0.05  # seconds
+STREAM_FLUSH_CHARS = 64
+
+# Every chatbot runs its Ollama coroutines on one long-lived background loop,
+# so they can all share a single AsyncClient (and its connection pool) for
+# the life of the process, and turns from different sessions overlap instead
+# of queuing. The client is only ever used on that loop, so it never needs
+# closing per session. Server-side concurrency is set with OLLAMA_NUM_PARALLEL
+# on the Ollama host.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_client: Optional[ollama.AsyncClient] = None
+_loop_lock = threading.Lock()
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background event loop, starting it on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='ollama-event-loop', daemon=True).start()
+        return _loop
+
+
+def _get_client() -> ollama.AsyncClient:
+    """Return the AsyncClient shared by every chatbot, creating it on first use"""
+    global _client
+    with _loop_lock:
+        if _client is None:
+            _client = ollama.AsyncClient()
+        return _client
+
+
+@dataclass(frozen=True)
+class InputView:
+    """A user message normalized once per turn for the checks that inspect it"""
+    raw: str
+    lower: str
+    words: Tuple[str, ...]
+
+    @classmethod
+    def from_text(cls, text: str) -> 'InputView':
+        raw = text.strip()
+        lower = raw.lower()
+        return cls(raw, lower, tuple(lower.split()))
+
+
+# Models confirmed available; a failed check isn't remembered so the next
+# chatbot tries again once Ollama is started or the model pulled
+_available_models: Set[str] = set()
+
+
+def _llm_available(model: str) -> bool:
+    """
+    Check whether Ollama is running and has model. A success is remembered
+    for the process, so creating a chatbot per session doesn't cost a
+    round trip to the server
+    """
+    if model in _available_models:
+        return True
+    
+    try:
+        ollama.show(model)
+    except ollama.ResponseError as e:
+        logger.warning(f"{model} model not found ({e.error}). Will use rule-based responses.")
+        logger.info(f"To install it, run: ollama pull {model}")
+        return False
+    except Exception as e:
+        logger.warning(f"Could not connect to Ollama: {e}")
+        logger.info("Make sure Ollama is running. Will use rule-based responses.")
+        return False
+    
+    logger.info(f"{model} model is available")
+    _available_models.add(model)
+    return True
+
+
+# System prompt for the LLM, byte-identical on every chat request
+SYSTEM_PROMPT = """You are TalentScout AI Assistant, a friendly and professional technical recruiter conducting initial candidate screening.
+
+Your role:
+1. Collect candidate information: full name, email, phone, years of experience, desired position, location, and detailed tech stack
+2. Generate 5 tailored technical questions based on the candidate's tech stack
+3. Ask technical questions one by one and evaluate answers
+4. Be conversational, friendly, and professional
+5. Handle clarifications and follow-up questions naturally
+6. Stay focused on the screening purpose but be helpful and engaging
+
+Guidelines:
+- Be warm and encouraging
+- Ask for clarification when answers are unclear
+- Acknowledge good answers
+- If someone asks you something off-topic, politely redirect them back to the screening
+- If someone asks your name, respond naturally: "I'm TalentScout AI Assistant"
+- Maintain conversation context throughout
+- End gracefully when screening is complete or user wants to exit"""
+
+# (model, system prompt) pairs already evaluated by Ollama
+_warmed_prefixes: Set[Tuple[str, str]] = set()
+
+
+def _warm_prompt_prefix(model: str, system_prompt: str = SYSTEM_PROMPT) -> bool:
+    """
+    Load the model and evaluate the system prompt once per process so Ollama
+    has its KV cache ready. Every chat request starts with the same system
+    message, so later calls only pay for the tokens after it.
+    """
+    if (model, system_prompt) in _warmed_prefixes:
+        return True
+    
+    try:
+        ollama.chat(
+            model=model,
+            messages=[{'role': 'system', 'content': system_prompt}],
+            options={'num_predict': 1, 'num_ctx': MAX_CTX},
+            keep_alive=KEEP_ALIVE
+        )
+    except Exception as e:
+        logger.warning(f"Prompt prefix warm-up failed: {e}")
+        return False
+    
+    _warmed_prefixes.add((model, system_prompt))
+    return True
+
+
 class TalentScoutChatbot:
-    def __init__(self):
+    def __init__(self, llm_available: Optional[bool] = None, model: str = DEFAULT_MODEL):
+        self.model = model
+        self.client = _get_client()
+        # Turned off after the first embedding failure (e.g. model not pulled)
+        self.semantic_cache_enabled = True
+        self.response_cache = SemanticCache(threshold=0.95, max_entries=RESPONSE_CACHE_ENTRIES)
         self.conversation_state = {
             'step': 'greeting',
             'collected_data': {},
             'current_questions': [],
             'current_question_index': 0,
             'technical_answers': {},
-            'conversation_history': [],  # For LLM context
             'awaiting_field': None
         }
         
@@ -35,45 +298,34 @@ class TalentScoutChatbot:
                            'desired_position', 'current_location', 'tech_stack']
         self.current_field_index = 0
         
+        # LLM context, kept as parallel deques (role, content and approximate
+        # token count per message) plus the running token total
+        self._reset_history()
+        
+        # Set for the duration of a streamed turn; receives each generated chunk
+        self._on_token: Optional[Callable[[str], None]] = None
+        # Serializes turns; created on the background loop on first use
+        self._turn_lock: Optional[asyncio.Lock] = None
+        # Turn started by the last stream_message, until collect_turn takes it
+        self._turn_future: Optional[concurrent.futures.Future] = None
+        
         # System prompt for the LLM
-        self.system_prompt = """You are TalentScout AI Assistant, a friendly and professional technical recruiter conducting initial candidate screening.
-
-Your role:
-1. Collect candidate information: full name, email, phone, years of experience, desired position, location, and detailed tech stack
-2. Generate 5 tailored technical questions based on the candidate's tech stack
-3. Ask technical questions one by one and evaluate answers
-4. Be conversational, friendly, and professional
-5. Handle clarifications and follow-up questions naturally
-6. Stay focused on the screening purpose but be helpful and engaging
+        self.system_prompt = SYSTEM_PROMPT
 
-Guidelines:
-- Be warm and encouraging
-- Ask for clarification when answers are unclear
-- Acknowledge good answers
-- If someone asks you something off-topic, politely redirect them back to the screening
-- If someone asks your name, respond naturally: "I'm TalentScout AI Assistant"
-- Maintain conversation context throughout
-- End gracefully when screening is complete or user wants to exit"""
-
-        self._check_ollama_availability()
+        # Callers that already probed Ollama (e.g. the Streamlit app, once per
+        # process) can pass the result in and skip the extra round trip
+        if llm_available is None:
+            self._check_ollama_availability()
+        else:
+            self.llm_available = llm_available
 
-    def _check_ollama_availability(self):
-        """Check if Ollama is running and llama2 model is available"""
-        try:
-            models = ollama.list()
-            model_names = [model['name'] for model in models.get('models', [])]
-            
-            if not any('llama2' in name.lower() for name in model_names):
-                logger.warning("llama2 model not found. Will use rule-based responses.")
-                logger.info("To install llama2, run: ollama pull llama2")
-                self.llm_available = False
-            else:
-                logger.info("llama2 model is available")
-                self.llm_available = True
-        except Exception as e:
-            logger.warning(f"Could not connect to Ollama: {e}")
-            logger.info("Make sure Ollama is running. Will use rule-based responses.")
-            self.llm_available = False
+    def _check_ollama_availability(self) -> bool:
+        """Check if Ollama is running and the configured model is available"""
+        self.llm_available = _llm_available(self.model)
+        if self.llm_available:
+            _warm_prompt_prefix(self.model, self.system_prompt)
+        
+        return self.llm_available
 
     def get_greeting(self) -> str:
         """Return the initial greeting message"""
@@ -86,53 +338,154 @@ This should take about 10-15 minutes. Ready to get started?"""
     def process_message(self, user_input: str) -> Tuple[str, Dict]:
         """
         Process user input using LLM for natural conversation
+        (blocking wrapper around process_message_async)
+        """
+        future = asyncio.run_coroutine_threadsafe(self.process_message_async(user_input), _get_event_loop())
+        return future.result()
+
+    def stream_message(self, user_input: str) -> Iterator[str]:
         """
-        user_input = user_input.strip()
+        Process user input like process_message, yielding the reply as it is
+        generated. The (response, state_info) pair for the turn is returned by
+        collect_turn, also when the stream was abandoned part way through.
+        """
+        chunks: queue.Queue = queue.Queue()
+        
+        future = asyncio.run_coroutine_threadsafe(
+            self.process_message_async(user_input, chunks.put), _get_event_loop()
+        )
+        future.add_done_callback(lambda _: chunks.put(None))
+        self._turn_future = future
+        
+        # Buffer tokens and flush every STREAM_FLUSH_INTERVAL seconds or
+        # STREAM_FLUSH_CHARS characters to avoid a rerender per token
+        streamed = False
+        buf = ''
+        last_flush = time.monotonic()
+        while True:
+            try:
+                chunk = chunks.get(timeout=STREAM_FLUSH_INTERVAL if buf else None)
+            except queue.Empty:
+                chunk = ''
+            
+            if chunk is None:
+                break
+            
+            if chunk:
+                streamed = True
+                buf += chunk
+            
+            if buf and (time.monotonic() - last_flush >= STREAM_FLUSH_INTERVAL or len(buf) >= STREAM_FLUSH_CHARS):
+                yield buf
+                buf = ''
+                last_flush = time.monotonic()
+        
+        if buf:
+            yield buf
+        
+        # Rule-based and fallback replies never touch the LLM stream
+        if not streamed:
+            yield future.result()[0]
+
+    def collect_turn(self) -> Optional[Tuple[str, Dict]]:
+        """
+        Return (response, state_info) for the turn started by the last
+        stream_message, waiting for it to finish; None once collected.
+        The turn keeps running if its stream is abandoned (e.g. a Streamlit
+        rerun interrupts it), so the caller can still record its reply.
+        """
+        future, self._turn_future = self._turn_future, None
+        return None if future is None else future.result()
+
+    async def process_message_async(self, user_input: str,
+                                    on_token: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict]:
+        """
+        Process user input using LLM for natural conversation, passing each
+        generated chunk to on_token. Ollama calls are awaited so independent
+        requests can overlap, but the turns of one conversation run one at a
+        time, in the order they were submitted.
+        """
+        if self._turn_lock is None:
+            self._turn_lock = asyncio.Lock()
+        
+        async with self._turn_lock:
+            self._on_token = on_token
+            try:
+                return await self._process_turn(user_input)
+            finally:
+                self._on_token = None
+
+    async def _process_turn(self, user_input: str) -> Tuple[str, Dict]:
+        """One turn of process_message_async, run under the turn lock"""
+        view = InputView.from_text(user_input)
+        user_input = view.raw
         
         # Add to conversation history
-        self.conversation_state['conversation_history'].append({
-            'role': 'user',
-            'content': user_input
-        })
+        self._append_history('user', user_input)
         
         # Check for exit commands
-        if self._is_exit_command(user_input):
-            response = self._handle_exit()
+        if self._is_exit_command(view):
+            response = await self._handle_exit()
             self._add_assistant_message(response)
             return response, self._get_state_info()
         
         # Route based on current step
         if self.conversation_state['step'] == 'greeting':
-            response = self._handle_greeting_response(user_input)
+            response = await self._handle_greeting_response(user_input)
         elif self.conversation_state['step'] == 'collecting_info':
-            response = self._handle_info_collection(user_input)
+            response = await self._handle_info_collection(view)
         elif self.conversation_state['step'] == 'technical_questions':
-            response = self._handle_technical_questions(user_input)
+            response = await self._handle_technical_questions(view)
         elif self.conversation_state['step'] == 'complete':
-            response = self._handle_post_completion(user_input)
+            response = await self._handle_post_completion(user_input)
         else:
-            response = self._get_llm_response(user_input, "Handle this unexpected state naturally.")
+            response = await self._get_llm_response(user_input, "Handle this unexpected state naturally.")
         
         self._add_assistant_message(response)
         return response, self._get_state_info()
 
     def _add_assistant_message(self, message: str):
         """Add assistant message to conversation history"""
-        self.conversation_state['conversation_history'].append({
-            'role': 'assistant',
-            'content': message
-        })
-        # Keep only last 30 messages
-        if len(self.conversation_state['conversation_history']) > 30:
-            self.conversation_state['conversation_history'] = \
-                self.conversation_state['conversation_history'][-30:]
-
-    def _is_exit_command(self, user_input: str) -> bool:
+        self._append_history('assistant', message)
+
+    def _reset_history(self):
+        """Start an empty LLM history"""
+        self._history_roles: deque = deque(maxlen=MAX_HISTORY_MESSAGES)
+        self._history_contents: deque = deque(maxlen=MAX_HISTORY_MESSAGES)
+        self._history_token_counts: deque = deque(maxlen=MAX_HISTORY_MESSAGES)
+        self._history_tokens = 0
+
+    def _history_messages(self) -> List[Dict[str, str]]:
+        """Materialize the history as chat messages for an Ollama request"""
+        return [{'role': role, 'content': content}
+                for role, content in zip(self._history_roles, self._history_contents)]
+
+    def _append_history(self, role: str, content: str):
+        """
+        Append a message to the LLM history, then drop the oldest messages
+        until the history fits in HISTORY_TOKEN_BUDGET (the newest message
+        is always kept). The deques evict past MAX_HISTORY_MESSAGES on their own.
+        """
+        if len(self._history_token_counts) == self._history_token_counts.maxlen:
+            self._history_tokens -= self._history_token_counts[0]
+        
+        self._history_roles.append(role)
+        self._history_contents.append(content)
+        
+        tokens = _approx_tokens(content)
+        self._history_token_counts.append(tokens)
+        self._history_tokens += tokens
+        
+        while self._history_tokens > HISTORY_TOKEN_BUDGET and len(self._history_roles) > 1:
+            self._history_roles.popleft()
+            self._history_contents.popleft()
+            self._history_tokens -= self._history_token_counts.popleft()
+
+    def _is_exit_command(self, view: InputView) -> bool:
         """Check if user wants to exit"""
-        exit_words = ['bye', 'exit', 'quit', 'goodbye', 'stop', 'end']
-        return any(word in user_input.lower().split() for word in exit_words)
+        return not _EXIT_WORDS.isdisjoint(view.words)
 
-    def _handle_exit(self) -> str:
+    async def _handle_exit(self) -> str:
         """Gracefully conclude the conversation using LLM"""
         self.conversation_state['step'] = 'complete'
         
@@ -142,47 +495,41 @@ This should take about 10-15 minutes. Ready to get started?"""
 
 Generate a warm goodbye message. If they completed the screening, thank them and explain next steps (review within 24-48 hours, contact within 2-3 business days). If incomplete, thank them for their time and invite them to return."""
 
-        return self._get_llm_response("bye", context)
+        return await self._get_llm_response("bye", context)
 
-    def _handle_greeting_response(self, user_input: str) -> Tuple[str, Dict]:
+    async def _handle_greeting_response(self, user_input: str) -> Tuple[str, Dict]:
         """Handle initial greeting and transition to info collection"""
         self.conversation_state['step'] = 'collecting_info'
         self.conversation_state['awaiting_field'] = self.field_order[0]
         
         context = f"""The candidate has responded to your greeting. Now naturally transition to asking for their full name. Be friendly and conversational."""
         
-        return self._get_llm_response(user_input, context)
+        return await self._get_llm_response(user_input, context, cacheable=True)
 
-    def _handle_info_collection(self, user_input: str) -> str:
+    async def _handle_info_collection(self, view: InputView) -> str:
         """Handle information collection using LLM for natural conversation"""
         
+        user_input = view.raw
         current_field = self.conversation_state['awaiting_field']
         
         # Check if this looks like an off-topic question
-        if self._is_off_topic_question(user_input):
-            context = f"""The candidate asked you: "{user_input}"
-            
-This seems like a question about you or something off-topic. Answer it naturally and briefly, then gently guide them back to the screening. 
+        if self._is_off_topic_question(view):
+            context = f"""The candidate's last message seems like a question about you or something off-topic. Answer it naturally and briefly, then gently guide them back to the screening. 
 
 Currently waiting for: {self.info_fields[current_field]}
 Already collected: {list(self.conversation_state['collected_data'].keys())}
 
 Be helpful but keep the screening on track."""
             
-            return self._get_llm_response(user_input, context)
+            return await self._get_llm_response(user_input, context, cacheable=True)
         
         # Validate the input for current field
         validation = self._validate_field(current_field, user_input)
         
         if not validation['valid']:
-            # Use LLM to naturally request correction
-            context = f"""The candidate provided: "{user_input}" for their {self.info_fields[current_field]}.
-
-This is invalid because: {validation['message']}
-
-Politely point out the issue and ask them to provide it again. Be friendly and helpful."""
-            
-            return self._get_llm_response(user_input, context)
+            # A templated re-ask says all that is needed; no LLM round trip
+            label = self.info_fields[current_field].split(' (')[0]
+            return f"That doesn't look quite right for your {label} - {validation['message']}. Could you share it again?"
         
         # Store the validated data
         self.conversation_state['collected_data'][current_field] = user_input
@@ -204,72 +551,31 @@ Special instructions:
 - Be conversational and natural
 - Acknowledge what they just provided"""
             
-            return self._get_llm_response(user_input, context)
+            return await self._get_llm_response(user_input, context)
         else:
             # All info collected, move to technical questions
-            return self._start_technical_questions()
+            return await self._start_technical_questions()
 
-    def _is_off_topic_question(self, user_input: str) -> bool:
+    def _is_off_topic_question(self, view: InputView) -> bool:
         """Detect if user is asking an off-topic question"""
-        question_patterns = [
-            r'what is your name',
-            r'who are you',
-            r'what can you do',
-            r'how are you',
-            r'tell me about',
-            r'what do you',
-            r'can you help',
-            r'what.*\?',
-        ]
-        
-        user_lower = user_input.lower()
+        user_lower = view.lower
         
         # Check if it's a question (has '?' or starts with question word)
-        is_question = '?' in user_input or any(user_lower.startswith(q) for q in 
-            ['what', 'who', 'how', 'why', 'when', 'where', 'can', 'could', 'would'])
+        is_question = '?' in user_lower or user_lower.startswith(_Q_WORDS)
         
         if is_question:
-            # Check if it's about information we're collecting
-            info_related = any(field in user_lower for field in 
-                ['name', 'email', 'phone', 'experience', 'position', 'location', 'tech', 'skill'])
-            
             # If it's a question but not about info collection, it's off-topic
-            return not info_related
+            return _INFO_RE.search(user_lower) is None
         
         return False
 
     def _validate_field(self, field: str, value: str) -> Dict[str, Any]:
-        """Validate individual fields"""
-        value = value.strip()
-        
-        validations = {
-            'email': {
-                'pattern': r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$',
-                'message': "it doesn't appear to be a valid email format"
-            },
-            'phone': {
-                'pattern': r'^[\+]?[0-9\s\-\(\)]{10,}$',
-                'message': "it should be a valid phone number with at least 10 digits"
-            },
-            'years_experience': {
-                'pattern': r'^\d+\.?\d*$',
-                'message': "it should be a number (e.g., 5 or 3.5)"
-            },
-            'full_name': {
-                'min_length': 2,
-                'message': "it seems too short for a full name"
-            },
-            'tech_stack': {
-                'min_length': 10,
-                'message': "please provide more details about your tech stack"
-            }
-        }
-        
-        if field in validations:
-            validation = validations[field]
+        """Validate individual fields (value is already stripped)"""
+        if field in _FIELD_VALIDATIONS:
+            validation = _FIELD_VALIDATIONS[field]
             
             if 'pattern' in validation:
-                if not re.match(validation['pattern'], value):
+                if not validation['pattern'].match(value):
                     return {'valid': False, 'message': validation['message']}
             
             if 'min_length' in validation:
@@ -278,13 +584,13 @@ Special instructions:
         
         return {'valid': True, 'message': ''}
 
-    def _start_technical_questions(self) -> str:
+    async def _start_technical_questions(self) -> str:
         """Start technical question phase"""
         self.conversation_state['step'] = 'technical_questions'
         
         # Generate questions based on tech stack
         tech_stack = self.conversation_state['collected_data'].get('tech_stack', '')
-        questions = self._generate_technical_questions(tech_stack)
+        questions = await self._generate_technical_questions(tech_stack)
         
         self.conversation_state['current_questions'] = questions
         self.conversation_state['current_question_index'] = 0
@@ -301,9 +607,9 @@ Now:
 
 Be encouraging and set a positive tone for the technical assessment."""
 
-        return self._get_llm_response("ready for questions", context)
+        return await self._get_llm_response("ready for questions", context)
 
-    def _generate_technical_questions(self, tech_stack: str) -> List[str]:
+    async def _generate_technical_questions(self, tech_stack: str) -> List[str]:
         """Generate technical questions based on tech stack using LLM"""
         
         technologies = self._parse_tech_stack(tech_stack)
@@ -319,12 +625,28 @@ Requirements:
 - Appropriate for initial screening
 - Mix practical and conceptual questions
 
-Return ONLY the 5 questions, one per line, no numbering or formatting."""
+Return ONLY a JSON object of the form {{"questions": ["...", "...", "...", "...", "..."]}}, no numbering inside the strings."""
 
+        # Recurring stacks reuse questions generated for an earlier candidate.
+        # The prompt quotes the raw stack, so it is part of the key along with
+        # the recognised technologies. SQLite runs on the default executor to
+        # keep the shared event loop free for other sessions' turns
+        normalized_stack = ' '.join(tech_stack.lower().split())
+        cache_key = hashlib.sha1(
+            json.dumps([self.model, sorted(technologies), normalized_stack]).encode()
+        ).hexdigest()
+        loop = asyncio.get_running_loop()
+        
+        cached = await loop.run_in_executor(None, _load_cached_questions, cache_key)
+        if cached:
+            logger.info("Using cached technical questions")
+            return cached
+        
         try:
             if self.llm_available:
-                response = ollama.chat(
-                    model='llama2',
+                # All questions come back from a single round trip as JSON
+                response = await self.client.chat(
+                    model=self.model,
                     messages=[
                         {
                             'role': 'system',
@@ -335,13 +657,16 @@ Return ONLY the 5 questions, one per line, no numbering or formatting."""
                             'content': prompt
                         }
                     ],
-                    options={'temperature': 0.7, 'num_predict': 500}
+                    format='json',
+                    options={'temperature': 0.7, 'num_predict': 500, 'num_ctx': MAX_CTX},
+                    keep_alive=KEEP_ALIVE
                 )
                 
                 questions_text = response['message']['content'].strip()
-                questions = self._parse_questions(questions_text)
+                questions = self._parse_questions(self._extract_json_questions(questions_text))
                 
                 if len(questions) >= 5:
+                    await loop.run_in_executor(None, _store_cached_questions, cache_key, questions[:5])
                     return questions[:5]
         except Exception as e:
             logger.error(f"Question generation failed: {e}")
@@ -349,39 +674,31 @@ Return ONLY the 5 questions, one per line, no numbering or formatting."""
         # Fallback questions
         return self._generate_fallback_questions(technologies)
 
-    def _parse_tech_stack(self, tech_stack: str) -> List[str]:
-        """Parse tech stack to identify technologies"""
-        tech_keywords = ['python', 'java', 'javascript', 'typescript', 'react', 'angular', 
-                        'vue', 'django', 'flask', 'spring', 'node', 'postgresql', 'mysql', 
-                        'mongodb', 'redis', 'docker', 'kubernetes', 'aws', 'azure', 'git']
-        
-        tech_lower = tech_stack.lower()
-        found = []
+    def _extract_json_questions(self, text: str) -> str:
+        """Flatten the JSON question list to one question per line"""
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            # Not valid JSON; let the line parser handle the raw text
+            return text
         
-        for keyword in tech_keywords:
-            if keyword in tech_lower:
-                found.append(keyword.title())
+        questions = data.get('questions', []) if isinstance(data, dict) else data
+        if not isinstance(questions, list):
+            return text
         
-        return list(dict.fromkeys(found))
+        return '\n'.join(str(q) for q in questions)
+
+    def _parse_tech_stack(self, tech_stack: str) -> List[str]:
+        """Parse tech stack to identify technologies, in order of appearance"""
+        # dict as an insertion-ordered set
+        found: Dict[str, None] = {}
+        for match in _TECH_RE.finditer(tech_stack):
+            found[match.group(1).title()] = None
+        return list(found)
 
     def _parse_questions(self, text: str) -> List[str]:
         """Parse questions from LLM response"""
-        questions = []
-        lines = text.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Remove numbering and bullets
-            line = re.sub(r'^[\d]+[\.\)\:]\s*', '', line)
-            line = re.sub(r'^[-•*]\s*', '', line)
-            
-            if len(line) > 20:
-                questions.append(line)
-        
-        return questions
+        return [m.group(1) for m in _QUESTION_LINE_RE.finditer(text) if len(m.group(1)) > 20]
 
     def _generate_fallback_questions(self, technologies: List[str]) -> List[str]:
         """Generate fallback questions"""
@@ -411,35 +728,29 @@ Return ONLY the 5 questions, one per line, no numbering or formatting."""
         questions.extend(general)
         return questions[:5]
 
-    def _handle_technical_questions(self, user_input: str) -> str:
+    async def _handle_technical_questions(self, view: InputView) -> str:
         """Handle technical question phase with LLM"""
         
+        user_input = view.raw
         current_index = self.conversation_state['current_question_index']
         questions = self.conversation_state['current_questions']
         current_question = questions[current_index]
         
         # Check if they're asking something off-topic
-        if self._is_off_topic_question(user_input):
-            context = f"""The candidate asked: "{user_input}" instead of answering the technical question.
+        if self._is_off_topic_question(view):
+            context = f"""The candidate's last message is a question instead of an answer to the technical question.
 
 Current question: {current_question}
 
 Answer their question briefly and naturally, then guide them back to answering the technical question. Be friendly but keep focus on the screening."""
             
-            return self._get_llm_response(user_input, context)
+            return await self._get_llm_response(user_input, context, cacheable=True)
         
         # Check if answer is too short
-        if len(user_input.split()) < 5:
-            context = f"""The candidate gave a very short answer: "{user_input}" to the question: "{current_question}"
-
-This is too brief to assess their skills. Politely ask them to elaborate with:
-- Specific examples from their experience
-- Technical details
-- Challenges and solutions
-
-Be encouraging and supportive."""
-            
-            return self._get_llm_response(user_input, context)
+        if len(view.words) < 5:
+            return (f"Could you tell me a bit more? To get a sense of your experience, "
+                    f"please elaborate with specific examples, technical details, or challenges "
+                    f"you solved.\n\nQuestion {current_index + 1}: {current_question}")
         
         # Store answer
         self.conversation_state['technical_answers'][current_question] = user_input
@@ -452,45 +763,46 @@ Be encouraging and supportive."""
             next_index = self.conversation_state['current_question_index']
             next_question = questions[next_index]
             
-            context = f"""The candidate just answered: "{user_input}"
-
-That was question {current_index + 1} of {len(questions)}.
-
-Now:
-1. Acknowledge their answer positively
-2. Briefly comment on their answer if relevant
-3. Mention it's question {next_index + 1} of {len(questions)}
-4. Ask the next question: "{next_question}"
-
-Be natural and encouraging."""
-            
-            return self._get_llm_response(user_input, context)
+            # Commentary on the answers is deferred to _complete_screening,
+            # which evaluates them all in a single LLM call
+            return f"Got it, thanks! Here's question {next_index + 1} of {len(questions)}:\n\n{next_question}"
         else:
             # All questions answered
-            return self._complete_screening()
+            return await self._complete_screening()
 
-    def _complete_screening(self) -> str:
+    async def _complete_screening(self) -> str:
         """Complete the screening"""
         self.conversation_state['step'] = 'complete'
         
         name = self.conversation_state['collected_data'].get('full_name', 'there')
         
-        context = f"""The candidate ({name}) has completed all technical questions!
+        # The answers are already in the history, so the reply is generated
+        # without it and the answers get its token budget, split evenly
+        technical_answers = self.conversation_state['technical_answers']
+        answer_chars = 4 * HISTORY_TOKEN_BUDGET // max(1, len(technical_answers))
+        answers = '\n\n'.join(
+            _clip(f"Q{i}: {question}\nA{i}: {answer}", answer_chars)
+            for i, (question, answer) in enumerate(technical_answers.items(), 1)
+        )
+        
+        context = f"""The candidate ({name}) has completed all technical questions. Their answers:
+
+{answers}
 
 Generate a warm completion message that:
 1. Congratulates them on completing the screening
-2. Thanks them for their time and detailed answers
+2. Briefly comments on their answers as a whole, mentioning a strength or two
 3. Explains next steps:
    - Team will review within 24-48 hours
    - Recruiter will contact via email within 2-3 business days
    - May include technical interview or coding assessment
-4. Wish them well
+4. Thanks them for their time and wishes them well
 
 Be warm, professional, and encouraging."""
         
-        return self._get_llm_response("completed", context)
+        return await self._get_llm_response("completed", context, history=[])
 
-    def _handle_post_completion(self, user_input: str) -> str:
+    async def _handle_post_completion(self, user_input: str) -> str:
         """Handle messages after screening is complete"""
         context = f"""The screening is already complete. The candidate said: "{user_input}"
 
@@ -498,39 +810,106 @@ Respond naturally. If they're asking a question, answer it. If they're saying go
 
 Be helpful and friendly."""
         
-        return self._get_llm_response(user_input, context)
+        return await self._get_llm_response(user_input, context)
 
-    def _get_llm_response(self, user_input: str, context_instruction: str) -> str:
-        """Get response from LLM with context"""
+    async def _get_llm_response(self, user_input: str, context_instruction: str,
+                                cacheable: bool = False,
+                                history: Optional[List[Dict[str, str]]] = None) -> str:
+        """
+        Get response from LLM with context, after history (the conversation
+        so far when None). With cacheable, the context must carry no candidate
+        data: the reply is generated from user_input alone, without history,
+        and reused for similar messages later in this conversation.
+        """
         
         if not self.llm_available:
             return self._get_fallback_response(context_instruction)
         
+        if not cacheable:
+            try:
+                return await self._generate_llm_response(context_instruction, self._on_token, history)
+            except Exception as e:
+                logger.error(f"LLM response failed: {e}")
+                return self._get_fallback_response(context_instruction)
+        
+        scope = f"{self.conversation_state['step']}\n{context_instruction}"
+        embedding = await self._embed(user_input)
+        
+        if embedding is not None:
+            cached = self.response_cache.lookup(embedding, scope)
+            if cached is not None:
+                logger.info("Semantic cache hit")
+                return cached
+        
         try:
-            # Build messages for LLM
-            messages = [
-                {'role': 'system', 'content': self.system_prompt},
-                {'role': 'system', 'content': f"Current context: {context_instruction}"}
-            ]
-            
-            # Add recent conversation history
-            messages.extend(self.conversation_state['conversation_history'][-10:])
-            
-            response = ollama.chat(
-                model='llama2',
-                messages=messages,
-                options={
-                    'temperature': 0.7,
-                    'top_p': 0.9,
-                    'num_predict': 300
-                }
-            )
-            
-            return response['message']['content'].strip()
-            
+            response = await self._generate_llm_response(context_instruction, self._on_token,
+                                                         [{'role': 'user', 'content': user_input}])
         except Exception as e:
             logger.error(f"LLM response failed: {e}")
             return self._get_fallback_response(context_instruction)
+        
+        if embedding is not None and response:
+            self.response_cache.insert(embedding, response, scope)
+        
+        return response
+
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed text for the semantic cache; None when the cache is unavailable"""
+        if not self.semantic_cache_enabled:
+            return None
+        
+        try:
+            response = await self.client.embeddings(model=EMBED_MODEL, prompt=text)
+            return response['embedding']
+        except Exception as e:
+            logger.warning(f"Embedding failed, disabling semantic cache: {e}")
+            logger.info(f"To enable it, run: ollama pull {EMBED_MODEL}")
+            self.semantic_cache_enabled = False
+            return None
+
+    async def _generate_llm_response(self, context_instruction: str,
+                                     on_token: Optional[Callable[[str], None]] = None,
+                                     history: Optional[List[Dict[str, str]]] = None) -> str:
+        """
+        Generate a fresh response from the LLM, passing each chunk to on_token.
+        history replaces the conversation history when given.
+        """
+        # Build messages for LLM. The system prompt is the only system message,
+        # byte-identical on every call, and the per-turn context goes last as
+        # a user turn so Ollama can reuse the cached prefix (system prompt +
+        # history) instead of re-evaluating it. Chat templates merge every
+        # system message into the single system block ahead of the history,
+        # so the context must not be sent with the system role
+        messages = [{'role': 'system', 'content': self.system_prompt}]
+        
+        # Add recent conversation history (already trimmed to the token budget)
+        messages.extend(self._history_messages() if history is None else history)
+        
+        messages.append({'role': 'user', 'content': f"Current context: {context_instruction}"})
+        
+        options = {
+            'temperature': 0.7,
+            'top_p': 0.9,
+            'num_predict': 300,
+            'num_ctx': MAX_CTX
+        }
+        
+        # Always stream; tokens are forwarded to on_token (if any) as they
+        # arrive and accumulated into the final reply either way
+        parts = []
+        async for chunk in await self.client.chat(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            options=options,
+            keep_alive=KEEP_ALIVE
+        ):
+            content = chunk['message']['content']
+            parts.append(content)
+            if on_token is not None:
+                on_token(content)
+        
+        return ''.join(parts).strip()
 
     def _get_fallback_response(self, context_instruction: str) -> str:
         """Fallback response when LLM is unavailable"""
@@ -576,10 +955,12 @@ Be helpful and friendly."""
             'current_questions': [],
             'current_question_index': 0,
             'technical_answers': {},
-            'conversation_history': [],
             'awaiting_field': None
         }
         self.current_field_index = 0
+        self._reset_history()
+        # A new screening may be a different candidate
+        self.response_cache.clear()
         logger.info("Conversation reset")
 
 
@@ -1,157 +1,467 @@
-import subprocess
-import json
+from __future__ import annotations
+
+import atexit
+import asyncio
+import threading
+import time
+import httpx
+import orjson
 import requests
 import streamlit as st
-from typing import List, Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections.abc import Callable, Iterator
+from typing import Any
+
+
+# Connections kept per host by the session and the async clients
+MAX_POOL_SIZE = 20
+
+# Request bodies are serialized with orjson and sent as raw bytes;
+# responses are parsed with orjson straight from the bytes
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# (connect, read) timeouts for generation and chat requests: fail fast when
+# the server is down, but allow long gaps while a model loads or decodes
+CONNECT_TIMEOUT = 3.0
+READ_TIMEOUT = 120.0
+
+# Returned by generation calls made before the startup probe has finished
+_CONNECTING_MESSAGE = "Still connecting to Ollama. Please try again in a moment."
+
+# Seconds before a failed probe is retried by the next generation call, so a
+# server started after the app is picked up without a restart
+PROBE_RETRY_SECONDS = 30.0
+
+
+def _iter_json_lines(response: requests.Response) -> Iterator[dict[str, Any]]:
+    """
+    Yield each object of a streamed newline-delimited JSON response. Reads
+    in large chunks (urllib3 still hands over each HTTP chunk as it arrives)
+    and splits lines with bytes methods instead of iter_lines' generator
+    """
+    buf = bytearray()
+    for data in response.iter_content(chunk_size=65536):
+        buf.extend(data)
+        start = 0
+        while (end := buf.find(b'\n', start)) != -1:
+            line = buf[start:end]
+            if line.strip():
+                yield orjson.loads(line)
+            start = end + 1
+        del buf[:start]
+    
+    if buf.strip():
+        yield orjson.loads(buf)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_models(host: str, _session: requests.Session) -> list[str]:
+    """
+    Return the names of the models installed on the Ollama server at host.
+    Cached per host for an hour; errors raise and so are never cached
+    """
+    response = _session.get(f"{host}/api/tags", timeout=(2.0, 5.0))
+    response.raise_for_status()
+    return [model['name'] for model in orjson.loads(response.content).get('models', [])]
+
 
 class OllamaManager:
-    def __init__(self, host="http://localhost:11434"):
+    # Generation options shared by every request; per-call values are merged in
+    _BASE_OPTIONS = {"top_p": 0.9, "stop": ("</s>", "assistant:", "user:")}
+    
+    def __init__(self, host="http://localhost:11434", verbose: bool = False):
         self.host = host
+        # Show the "Ollama is running" banner (once per session) on checks
+        self.verbose = verbose
         self.available_models = []
+        # Hashed snapshot of available_models for membership checks
+        self._models_set = frozenset()
         self.current_model = "llama2"  # Default model
-        self.is_available = False
-        self.check_ollama_availability()
+        # None until the background probe started below has finished
+        self.is_available: bool | None = None
+        # time.monotonic() of the last finished probe
+        self._last_probe = 0.0
+        # Probe running on the executor for async callers, shared between them
+        self._pending_probe: asyncio.Future | None = None
+        # Set when an async request hit a 404; the model list is refreshed
+        # once the request (or the whole batch) is done
+        self._models_stale = False
+        
+        # One pooled keep-alive session for every call to the Ollama server,
+        # instead of a new TCP connection per request
+        self.session = requests.Session()
+        self.session.headers.update({"Connection": "keep-alive"})
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=MAX_POOL_SIZE,
+            # Retry connection failures (including a stale keep-alive socket)
+            # and transient gateway/overload statuses; never retry a read
+            # that may have partially streamed
+            max_retries=Retry(
+                total=3,
+                connect=3,
+                read=0,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(["GET", "POST"]),
+                backoff_factor=0.2,
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        atexit.register(self.session.close)
+        
+        # Probe the server in the background so constructing the manager
+        # never blocks the first render
+        self._probe_thread = threading.Thread(target=self._probe, name='ollama-probe', daemon=True)
+        self._probe_thread.start()
+    
+    def _probe(self):
+        """Availability check without st.* calls, so it can run off the script thread"""
+        try:
+            self._set_models(_fetch_models(self.host, self.session))
+            self.is_available = True
+        except Exception:
+            self.is_available = False
+        self._last_probe = time.monotonic()
+    
+    def _set_models(self, models: list[str]):
+        """Replace the model list, keeping the membership snapshot in sync"""
+        self.available_models = models
+        self._models_set = frozenset(models)
+    
+    def wait_for_probe(self, timeout: float | None = None) -> bool | None:
+        """Block until the startup probe finishes (or timeout), returning is_available"""
+        self._probe_thread.join(timeout)
+        return self.is_available
     
     def check_ollama_availability(self) -> bool:
         """Check if Ollama is running and get available models"""
         try:
-            response = requests.get(f"{self.host}/api/tags")
-            if response.status_code == 200:
-                self.is_available = True
-                data = response.json()
-                self.available_models = [model['name'] for model in data.get('models', [])]
+            self._set_models(_fetch_models(self.host, self.session))
+            self.is_available = True
+            if self.verbose and "ollama_banner_shown" not in st.session_state:
                 st.success(f"✅ Ollama is running! Available models: {len(self.available_models)}")
-                return True
-            else:
-                st.warning("⚠️ Ollama is not responding properly")
-                return False
+                st.session_state.ollama_banner_shown = True
+            return True
+        except requests.HTTPError:
+            st.warning("⚠️ Ollama is not responding properly")
+            self.is_available = False
+            return False
         except Exception as e:
             st.warning(f"⚠️ Ollama is not available: {e}")
             self.is_available = False
             return False
     
+    def refresh_models(self) -> bool:
+        """Drop the cached model list and fetch it again from the server"""
+        _fetch_models.clear()
+        return self.check_ollama_availability()
+    
     def pull_model(self, model_name: str) -> bool:
         """Pull a model if not available"""
         try:
-            if model_name in self.available_models:
+            if model_name in self._models_set:
                 st.info(f"✅ Model '{model_name}' is already available")
                 return True
             
             st.info(f"🔄 Pulling model '{model_name}'... This may take a while.")
+            fraction = 0.0
+            progress = st.progress(fraction, text="Starting download...")
             
-            # Use subprocess to run ollama pull command
-            result = subprocess.run(
-                ["ollama", "pull", model_name],
-                capture_output=True,
-                text=True,
-                timeout=3600  # 1 hour timeout
-            )
-            
-            if result.returncode == 0:
-                st.success(f"✅ Successfully pulled model '{model_name}'")
-                self.available_models.append(model_name)
-                return True
-            else:
-                st.error(f"❌ Failed to pull model: {result.stderr}")
-                return False
+            # Pull through the server's streaming API; each line reports the
+            # status (and byte progress) of the layer being downloaded
+            with self.session.post(
+                f"{self.host}/api/pull",
+                json={"name": model_name, "stream": True},
+                stream=True,
+                timeout=(CONNECT_TIMEOUT, None)
+            ) as response:
+                response.raise_for_status()
                 
-        except subprocess.TimeoutExpired:
-            st.error("❌ Model pull timed out. Please try again.")
+                for update in _iter_json_lines(response):
+                    
+                    if 'error' in update:
+                        st.error(f"❌ Failed to pull model: {update['error']}")
+                        return False
+                    
+                    status = update.get('status', '')
+                    if update.get('total'):
+                        fraction = min(update.get('completed', 0) / update['total'], 1.0)
+                    elif status == 'success':
+                        fraction = 1.0
+                    progress.progress(fraction, text=status)
+                    
+                    if status == 'success':
+                        st.success(f"✅ Successfully pulled model '{model_name}'")
+                        self._set_models(self.available_models + [model_name])
+                        _fetch_models.clear()
+                        return True
+            
+            st.error("❌ Model pull ended before completing. Please try again.")
             return False
+                
         except Exception as e:
             st.error(f"❌ Error pulling model: {e}")
             return False
     
     def generate_response(self, prompt: str, model: str = None, system_prompt: str = None, 
-                         max_tokens: int = 500, temperature: float = 0.7) -> str:
-        """Generate response using Ollama"""
+                         max_tokens: int = 500, temperature: float = 0.7,
+                         on_token: Callable[[str], None] | None = None) -> str:
+        """
+        Generate response using Ollama. The response is streamed and
+        accumulated; on_token, if given, receives each chunk as it arrives
+        """
+        return self._post_chat(
+            self._prompt_messages(prompt, system_prompt),
+            model,
+            self._generation_options(max_tokens, temperature),
+            on_token
+        )
+    
+    def chat_completion(self, messages: list[dict[str, str]], model: str = None) -> str:
+        """Chat completion with conversation history"""
+        return self._post_chat(messages, model)
+    
+    def _unavailable_message(self) -> str | None:
+        """Return an error message if no request can be attempted yet"""
+        if self.is_available is None:
+            return _CONNECTING_MESSAGE
+        if self._probe_is_stale():
+            self._probe()
         if not self.is_available:
             return "Ollama is not available. Please make sure Ollama is running."
         
-        model_to_use = model or self.current_model
+        # The model itself isn't checked against available_models here, which
+        # may be stale; the server rejects unknown models with a 404
+        return None
+    
+    def _probe_is_stale(self) -> bool:
+        """Whether the server was unavailable at a probe old enough to retry"""
+        return self.is_available is False and time.monotonic() - self._last_probe > PROBE_RETRY_SECONDS
+    
+    async def _probe_async(self, refresh: bool = False):
+        """
+        Run _probe on the default executor so it never blocks the event loop;
+        concurrent callers on one loop share a single probe. With refresh,
+        the cached model list is dropped first
+        """
+        loop = asyncio.get_running_loop()
+        pending = self._pending_probe
+        if pending is None or pending.done() or pending.get_loop() is not loop:
+            if refresh:
+                _fetch_models.clear()
+            pending = self._pending_probe = loop.run_in_executor(None, self._probe)
+        await asyncio.shield(pending)
+    
+    async def _refresh_if_stale(self):
+        """Refresh the model list once after async requests hit a 404"""
+        if self._models_stale:
+            self._models_stale = False
+            await self._probe_async(refresh=True)
+    
+    @staticmethod
+    def _prompt_messages(prompt: str, system_prompt: str | None) -> list[dict[str, str]]:
+        """Express a single prompt (and optional system prompt) as chat messages"""
+        messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    def _generation_options(self, max_tokens: int, temperature: float) -> dict[str, Any]:
+        """Options for a single-prompt generation"""
+        return {**self._BASE_OPTIONS, "num_predict": max_tokens, "temperature": temperature}
+    
+    def _chat_payload(self, messages: list[dict[str, str]], model: str | None,
+                      options: dict[str, Any] | None) -> bytes:
+        """Serialize a streaming /api/chat request body"""
+        payload = {
+            "model": model or self.current_model,
+            "messages": messages,
+            "stream": True
+        }
+        
+        if options:
+            payload["options"] = options
         
-        if model_to_use not in self.available_models:
-            return f"Model '{model_to_use}' is not available. Available models: {', '.join(self.available_models)}"
+        return orjson.dumps(payload)
+    
+    def _post_chat(self, messages: list[dict[str, str]], model: str | None = None,
+                   options: dict[str, Any] | None = None,
+                   on_token: Callable[[str], None] | None = None) -> str:
+        """
+        The one synchronous request path: stream /api/chat and return the
+        accumulated reply, or an error message
+        """
+        error = self._unavailable_message()
+        if error:
+            return error
         
         try:
-            payload = {
-                "model": model_to_use,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "num_predict": max_tokens,
-                    "temperature": temperature,
-                    "top_p": 0.9,
-                    "stop": ["</s>", "assistant:", "user:"]
-                }
-            }
-            
-            if system_prompt:
-                payload["system"] = system_prompt
-            
-            response = requests.post(
-                f"{self.host}/api/generate",
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get('response', '').strip()
-            else:
-                return f"Error: {response.status_code} - {response.text}"
+            with self.session.post(
+                f"{self.host}/api/chat",
+                data=self._chat_payload(messages, model, options),
+                headers=_JSON_HEADERS,
+                stream=True,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+            ) as response:
+                if response.status_code != 200:
+                    return self._status_error(response.status_code, response.text)
+                
+                parts = []
+                for chunk in _iter_json_lines(response):
+                    # Failures after the headers arrive inside the 200 stream
+                    if 'error' in chunk:
+                        return f"Error: {chunk['error']}"
+                    token = chunk.get('message', {}).get('content', '')
+                    if token:
+                        parts.append(token)
+                        if on_token is not None:
+                            on_token(token)
+                    if chunk.get('done'):
+                        break
+                
+                return ''.join(parts).strip()
                 
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            return f"Error: {str(e)}"
     
-    def chat_completion(self, messages: List[Dict[str, str]], model: str = None) -> str:
-        """Chat completion with conversation history"""
-        if not self.is_available:
-            return "Ollama is not available."
+    def _status_error(self, status_code: int, text: str, refresh: bool = True) -> str:
+        """
+        Error message for a failed request. An unknown model (404) refreshes
+        the possibly stale model list, or with refresh=False marks it for
+        the async callers to refresh off the event loop
+        """
+        if status_code == 404:
+            if refresh:
+                self.refresh_models()
+            else:
+                self._models_stale = True
+        return f"Error: {status_code} - {text}"
+    
+    def _async_client(self) -> httpx.AsyncClient:
+        """
+        Create a pooled async client for this server. Clients are bound to the
+        event loop they are used on, so callers create one per loop
+        """
+        return httpx.AsyncClient(
+            base_url=self.host,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=MAX_POOL_SIZE),
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+        )
+    
+    async def generate_response_async(self, prompt: str, model: str = None, system_prompt: str = None,
+                                      max_tokens: int = 500, temperature: float = 0.7,
+                                      client: httpx.AsyncClient | None = None) -> str:
+        """Async generate_response; pass client to share connections between calls"""
+        return await self._post_chat_async(
+            self._prompt_messages(prompt, system_prompt),
+            model,
+            self._generation_options(max_tokens, temperature),
+            client
+        )
+    
+    async def chat_completion_async(self, messages: list[dict[str, str]], model: str = None,
+                                    client: httpx.AsyncClient | None = None) -> str:
+        """Async chat_completion; pass client to share connections between calls"""
+        return await self._post_chat_async(messages, model, None, client)
+    
+    async def _post_chat_async(self, messages: list[dict[str, str]], model: str | None,
+                               options: dict[str, Any] | None,
+                               client: httpx.AsyncClient | None) -> str:
+        """
+        Async counterpart of _post_chat on an httpx client. Probes and model
+        refreshes run on the executor, so a slow one never stalls the other
+        requests on the loop
+        """
+        if self._probe_is_stale():
+            await self._probe_async()
+        error = self._unavailable_message()
+        if error:
+            return error
         
-        model_to_use = model or self.current_model
+        if client is None:
+            async with self._async_client() as client:
+                reply = await self._post_chat_async(messages, model, options, client)
+            await self._refresh_if_stale()
+            return reply
         
         try:
-            payload = {
-                "model": model_to_use,
-                "messages": messages,
-                "stream": False
-            }
-            
-            response = requests.post(
-                f"{self.host}/api/chat",
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['message']['content'].strip()
-            else:
-                return f"Error: {response.status_code}"
+            async with client.stream("POST", "/api/chat", content=self._chat_payload(messages, model, options),
+                                     headers=_JSON_HEADERS) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    return self._status_error(response.status_code, response.text, refresh=False)
+                
+                parts = []
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = orjson.loads(line)
+                    if 'error' in chunk:
+                        return f"Error: {chunk['error']}"
+                    parts.append(chunk.get('message', {}).get('content', ''))
+                    if chunk.get('done'):
+                        break
+                
+                return ''.join(parts).strip()
                 
         except Exception as e:
-            return f"Error in chat completion: {str(e)}"
+            return f"Error: {str(e)}"
+    
+    def generate_batch(self, prompts: list[str], model: str = None, system_prompt: str = None,
+                       max_tokens: int = 500, temperature: float = 0.7) -> list[str]:
+        """
+        Generate responses for several independent prompts, in input order.
+        The requests are submitted concurrently so Ollama can run them in the
+        same forward pass (up to OLLAMA_NUM_PARALLEL on the server).
+        Must not be called from a running event loop; await
+        generate_batch_async there instead
+        """
+        if not prompts:
+            return []
+        
+        return asyncio.run(self.generate_batch_async(prompts, model, system_prompt, max_tokens, temperature))
+    
+    async def generate_batch_async(self, prompts: list[str], model: str = None, system_prompt: str = None,
+                                   max_tokens: int = 500, temperature: float = 0.7) -> list[str]:
+        """Async generate_batch; all requests share one client and at most one model refresh"""
+        async with self._async_client() as client:
+            replies = list(await asyncio.gather(*(
+                self.generate_response_async(prompt, model, system_prompt, max_tokens, temperature, client)
+                for prompt in prompts
+            )))
+        await self._refresh_if_stale()
+        return replies
     
-    def get_available_models(self) -> List[str]:
+    def get_available_models(self) -> list[str]:
         """Get list of available models"""
         return self.available_models
 
+@st.cache_resource(show_spinner=False)
+def get_ollama(verbose: bool = False) -> OllamaManager:
+    """
+    Return the process-wide OllamaManager (one per verbose setting), so its
+    pooled session, model list and availability survive Streamlit reruns
+    """
+    return OllamaManager(verbose=verbose)
+
 # Example usage and test
 def test_ollama():
     """Test function to verify Ollama setup"""
-    manager = OllamaManager()
+    manager = get_ollama()
+    
+    with st.spinner("Connecting to Ollama..."):
+        manager.wait_for_probe()
     
     if manager.is_available:
-        st.write("### Available Models:")
-        for model in manager.available_models:
-            st.write(f"- {model}")
+        st.markdown("### Available Models:\n" + "\n".join(f"- {model}" for model in manager.available_models))
         
         # Test generation
         test_prompt = "Hello, how are you?"
         response = manager.generate_response(test_prompt)
-        st.write("### Test Response:")
-        st.write(response)
+        st.markdown(f"### Test Response:\n{response}")
     else:
         st.error("Ollama is not available. Please make sure it's installed and running.")
 
@@ -0,0 +1,164 @@
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # e.g. no numba wheel for this platform; fall back to a NumPy matvec
+    njit = None
+
+
+def _best_match_numpy(vecs: np.ndarray, scales: np.ndarray, query: np.ndarray):
+    """
+    Return (index, score) of the int8 row of vecs most similar to the int8
+    query; score is the row's dot product times its scale
+    """
+    # einsum casts int8 -> int32 while streaming, without an int32 copy of vecs
+    scores = np.einsum('ij,j->i', vecs, query, dtype=np.int32) * scales
+    best = int(np.argmax(scores))
+    return best, float(scores[best])
+
+
+if njit is not None:
+    @njit(fastmath=True, cache=True)
+    def _best_match(vecs, scales, query):
+        """Fused int8 dot-product/argmax with integer accumulation, compiled by numba"""
+        best = 0
+        best_score = -np.inf
+        for i in range(vecs.shape[0]):
+            dot = 0
+            for k in range(vecs.shape[1]):
+                dot += np.int32(vecs[i, k]) * np.int32(query[k])
+            score = dot * scales[i]
+            if score > best_score:
+                best = i
+                best_score = score
+        return best, best_score
+else:
+    _best_match = _best_match_numpy
+
+
+class SemanticCache:
+    """
+    Cache LLM responses keyed by the embedding of their prompt.
+    A lookup returns the stored response whose key embedding has the highest
+    cosine similarity to the query, provided it reaches the threshold.
+    Every entry belongs to a scope which must match exactly, so only the
+    semantic part of a prompt is compared by similarity.
+    Entries are evicted least-recently-used once max_entries is reached.
+
+    Embeddings are stored as int8 with one float scale per entry, a quarter
+    of the memory of float32; the quantization error in the recovered cosine
+    is well under 0.01, far below the gap between a match and a miss.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512):
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        # Unit-length key embeddings quantized to int8, one row per entry,
+        # and the per-row scale that maps them back, so cosine similarity
+        # against a normalized query is a single integer dot product
+        self._vecs: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._responses: List[str] = []
+        self._scopes: List[str] = []
+        self._last_used: List[int] = []
+        # Slots holding each scope's entries
+        self._slots: Dict[str, List[int]] = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        """Convert an embedding to a unit-length float32 vector"""
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if vec.ndim != 1 or norm == 0:
+            return None
+        return vec / norm
+
+    @staticmethod
+    def _quantize(vec: np.ndarray):
+        """Quantize a unit vector to int8, returning (values, scale)"""
+        scale = float(np.max(np.abs(vec))) / 127
+        values = np.clip(np.round(vec / scale), -127, 127).astype(np.int8)
+        return values, scale
+
+    def lookup(self, embedding: Sequence[float], scope: str = '') -> Optional[str]:
+        """Return the cached response in scope closest to embedding, or None on a miss"""
+        query = self._normalize(embedding)
+
+        with self._lock:
+            if query is None or self._vecs is None or query.shape[0] != self._vecs.shape[1]:
+                return None
+
+            slots = self._slots.get(scope)
+            if not slots:
+                return None
+
+            q_values, q_scale = self._quantize(query)
+            best, score = _best_match(self._vecs[slots], self._scales[slots], q_values)
+            score *= q_scale
+
+            if score < self.threshold:
+                return None
+
+            best = slots[best]
+
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._responses[best]
+
+    def insert(self, embedding: Sequence[float], response: str, scope: str = ''):
+        """Store response under (scope, embedding), evicting the LRU entry when full"""
+        vec = self._normalize(embedding)
+        if vec is None:
+            return
+        values, scale = self._quantize(vec)
+
+        with self._lock:
+            if self._vecs is None or vec.shape[0] != self._vecs.shape[1]:
+                # First entry (or a different embedding model): start over
+                self._vecs = np.empty((self.max_entries, vec.shape[0]), dtype=np.int8)
+                self._scales = np.empty(self.max_entries, dtype=np.float32)
+                self._responses = []
+                self._scopes = []
+                self._last_used = []
+                self._slots = {}
+
+            self._clock += 1
+
+            if len(self._responses) < self.max_entries:
+                slot = len(self._responses)
+                self._responses.append(response)
+                self._scopes.append(scope)
+                self._last_used.append(self._clock)
+            else:
+                slot = int(np.argmin(self._last_used))
+                old_scope = self._scopes[slot]
+                self._slots[old_scope].remove(slot)
+                if not self._slots[old_scope]:
+                    del self._slots[old_scope]
+                self._responses[slot] = response
+                self._scopes[slot] = scope
+                self._last_used[slot] = self._clock
+
+            self._slots.setdefault(scope, []).append(slot)
+
+            self._vecs[slot] = values
+            self._scales[slot] = scale
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._vecs = None
+            self._scales = None
+            self._responses = []
+            self._scopes = []
+            self._last_used = []
+            self._slots = {}
@@ -1,30 +1,133 @@
 import sys
-from chatbot import HiringAssistant
+import asyncio
+import cProfile
+import chatbot
+from chatbot import TalentScoutChatbot
 
-def test_chatbot():
-    bot = HiringAssistant()
+class _FakeClient:
+    """
+    Stands in for ollama.AsyncClient: every text embeds the same, every reply
+    is new and streams in two chunks
+    """
+    def __init__(self):
+        self.replies = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def embeddings(self, model, prompt):
+        return {'embedding': [1.0, 0.0, 0.0]}
+
+    async def chat(self, **kwargs):
+        self.replies += 1
+        reply = f"reply {self.replies}"
+
+        async def stream():
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            yield {'message': {'content': reply[:-1]}}
+            await asyncio.sleep(0.1)
+            yield {'message': {'content': reply[-1]}}
+            self.active -= 1
+        return stream()
+
+def _fake_bot(client):
+    bot = TalentScoutChatbot(llm_available=True)
+    bot.client = client
+    return bot
+
+def test_parse_tech_stack():
+    parse = TalentScoutChatbot(llm_available=False)._parse_tech_stack
+
+    assert parse("Python3, Java8, python3.11") == ["Python", "Java"]
+    assert parse("Node.js, ReactJS, VueJS") == ["Node", "React", "Vue"]
+    assert parse("JavaScript") == ["Javascript"]
+    assert parse("GitHub Actions, Kubernetes(k8s)") == ["Git", "Kubernetes"]
+    assert parse("reactive pipelines") == []
+
+def test_cached_replies_stay_in_their_session():
+    client = _FakeClient()
+    first, second = _fake_bot(client), _fake_bot(client)
+
+    assert first.process_message("Hi, I'm Sarah")[0] == "reply 1"
+    assert second.process_message("Hi, I'm Tom")[0] == "reply 2"
+
+    # An off-topic question repeated in one session reuses its reply...
+    question = "How long will this take?"
+    assert first.process_message(question)[0] == "reply 3"
+    assert first.process_message(question)[0] == "reply 3"
+
+    # ...but never another session's, nor its own after a reset
+    assert second.process_message(question)[0] == "reply 4"
+    first.reset_conversation()
+    first.process_message("Hello")
+    assert first.process_message(question)[0] == "reply 6"
+
+def test_abandoned_stream_still_finishes_its_turn():
+    bot = _fake_bot(_FakeClient())
+
+    # A rerun stops reading the reply part way through...
+    stream = bot.stream_message("Hello")
+    assert next(stream) == "reply "
+    stream.close()
+
+    # ...but the turn completes and can still be recorded
+    assert bot.collect_turn()[0] == "reply 1"
+    assert bot.collect_turn() is None
+    assert bot.conversation_state['step'] == 'collecting_info'
+
+def test_turns_run_one_at_a_time():
+    client = _FakeClient()
+    bot = _fake_bot(client)
+    loop = chatbot._get_event_loop()
+
+    first = asyncio.run_coroutine_threadsafe(bot.process_message_async("Hello"), loop)
+    second = asyncio.run_coroutine_threadsafe(bot.process_message_async("What's the salary range?"), loop)
+
+    assert first.result()[0] == "reply 1"
+    assert second.result()[0] == "reply 2"
+    assert client.max_active == 1
+
+def run_conversation(profile=False):
+    """Run a scripted conversation against the local Ollama and print the transcript"""
+    bot = TalentScoutChatbot()
     
-    print(bot.get_greeting().encode('utf-8'))
+    # The transcript is collected and written once at the end, rather than
+    # a flushed write per line
+    output = [bot.get_greeting()]
     
     responses = [
+        "Hello",
         "John Doe",
         "john@email.com",
         "123-456-7890",
-        "3 years",
+        "3",
         "Software Engineer",
         "New York",
         "Python, JavaScript, React, SQL"
     ]
     
+    # With --profile, the scripted conversation is profiled and the stats
+    # written to chatbot.prof (view with: python -m pstats chatbot.prof)
+    profiler = cProfile.Profile() if profile else None
+    if profiler:
+        profiler.enable()
+    
     for response in responses:
-        print(f"\nYou: {response}")
-        bot_response = bot.process_message(response)
-        print(f"Bot: {bot_response}")
+        output.append(f"\nYou: {response}")
+        bot_response, _ = bot.process_message(response)
+        output.append(f"Bot: {bot_response}")
     
     # Test technical questions
-    print(f"\nYou: I'm ready")
-    print(f"Bot: {bot.process_message('ready')}")
+    output.append(f"\nYou: I'm ready")
+    output.append(f"Bot: {bot.process_message('ready')[0]}")
+    
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats("chatbot.prof")
+        output.append("\nProfile written to chatbot.prof")
+    
+    sys.stdout.write('\n'.join(output) + '\n')
 
 if __name__ == "__main__":
     sys.stdout.reconfigure(encoding='utf-8')
-    test_chatbot()
\ No newline at end of file
+    run_conversation(profile='--profile' in sys.argv[1:])
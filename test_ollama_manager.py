@@ -0,0 +1,59 @@
+import asyncio
+import contextlib
+import httpx
+from ollama_manager import OllamaManager, _iter_json_lines
+
+class _ChunkedResponse:
+    """Stands in for a streamed requests.Response, yielding fixed chunks"""
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def iter_content(self, chunk_size=1):
+        return iter(self.chunks)
+
+def test_line_split_across_chunks():
+    response = _ChunkedResponse([b'{"a": 1}\n{"b"', b': 2}\n{"c": ', b'3}\n'])
+    assert list(_iter_json_lines(response)) == [{"a": 1}, {"b": 2}, {"c": 3}]
+
+def test_blank_lines_are_skipped():
+    response = _ChunkedResponse([b'\n{"a": 1}\n\n', b'\r\n  \n{"b": 2}\r\n'])
+    assert list(_iter_json_lines(response)) == [{"a": 1}, {"b": 2}]
+
+def test_trailing_line_without_newline():
+    response = _ChunkedResponse([b'{"a": 1}\n{"done"', b': true}'])
+    assert list(_iter_json_lines(response)) == [{"a": 1}, {"done": True}]
+
+def test_empty_response():
+    assert list(_iter_json_lines(_ChunkedResponse([]))) == []
+
+class _FakeSession:
+    """Stands in for requests.Session, answering every POST with one streamed body"""
+    def __init__(self, body):
+        self.body = body
+
+    def post(self, url, **kwargs):
+        response = _ChunkedResponse([self.body])
+        response.status_code = 200
+        return contextlib.nullcontext(response)
+
+def _manager(body):
+    manager = OllamaManager(host="http://127.0.0.1:1")
+    manager.wait_for_probe()
+    manager.is_available = True
+    manager.session = _FakeSession(body)
+    return manager
+
+_ERROR_STREAM = b'{"message": {"content": "Hel"}, "done": false}\n{"error": "model runner crashed"}\n'
+
+def test_error_inside_stream():
+    assert _manager(_ERROR_STREAM).chat_completion([]) == "Error: model runner crashed"
+
+def test_error_inside_async_stream():
+    manager = _manager(b'')
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=_ERROR_STREAM))
+
+    async def chat():
+        async with httpx.AsyncClient(transport=transport, base_url=manager.host) as client:
+            return await manager._post_chat_async([], None, None, client)
+
+    assert asyncio.run(chat()) == "Error: model runner crashed"
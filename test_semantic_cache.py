@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+import semantic_cache
+from semantic_cache import SemanticCache
+
+def _unit(*values):
+    vec = np.array(values, dtype=np.float32)
+    return vec / np.linalg.norm(vec)
+
+def test_hit_and_miss():
+    cache = SemanticCache(threshold=0.95)
+    cache.insert([1.0, 0.0, 0.0], "first")
+
+    assert cache.lookup([1.0, 0.01, 0.0]) == "first"
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([0.0, 0.0, 0.0]) is None
+
+def test_scope_must_match():
+    cache = SemanticCache()
+    cache.insert([1.0, 0.0], "greeting reply", scope="greeting")
+
+    assert cache.lookup([1.0, 0.0], scope="greeting") == "greeting reply"
+    assert cache.lookup([1.0, 0.0], scope="off-topic") is None
+    assert cache.lookup([1.0, 0.0]) is None
+
+def test_lru_eviction():
+    cache = SemanticCache(max_entries=2)
+    cache.insert([1.0, 0.0, 0.0], "a")
+    cache.insert([0.0, 1.0, 0.0], "b")
+
+    # Touch "a" so "b" is the least recently used
+    assert cache.lookup([1.0, 0.0, 0.0]) == "a"
+    cache.insert([0.0, 0.0, 1.0], "c", scope="other")
+
+    assert len(cache) == 2
+    assert cache.lookup([1.0, 0.0, 0.0]) == "a"
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([0.0, 0.0, 1.0], scope="other") == "c"
+
+def test_int8_rounding():
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal(768).astype(np.float32)
+    noisy = base + 0.2 * rng.standard_normal(768).astype(np.float32)
+    cosine = float(_unit(*base) @ _unit(*noisy))
+
+    # A threshold just either side of the exact cosine decides hit or miss,
+    # so the quantized score is within 0.01 of it
+    below = SemanticCache(threshold=cosine - 0.01)
+    below.insert(base, "hit")
+    assert below.lookup(noisy) == "hit"
+
+    above = SemanticCache(threshold=cosine + 0.01)
+    above.insert(base, "hit")
+    assert above.lookup(noisy) is None
+
+def test_embedding_dimension_change():
+    cache = SemanticCache()
+    cache.insert([1.0, 0.0], "old model")
+
+    # A query from a different embedding model never matches
+    assert cache.lookup([1.0, 0.0, 0.0]) is None
+
+    # Inserting one starts the cache over
+    cache.insert([1.0, 0.0, 0.0], "new model")
+    assert len(cache) == 1
+    assert cache.lookup([1.0, 0.0, 0.0]) == "new model"
+    assert cache.lookup([1.0, 0.0]) is None
+
+def test_numba_kernel_matches_numpy():
+    pytest.importorskip("numba")
+    rng = np.random.default_rng(1)
+    vecs = rng.integers(-127, 128, size=(300, 768), dtype=np.int8)
+    scales = rng.random(300, dtype=np.float32)
+    query = rng.integers(-127, 128, size=768, dtype=np.int8)
+
+    best, score = semantic_cache._best_match(vecs, scales, query)
+    expected_best, expected_score = semantic_cache._best_match_numpy(vecs, scales, query)
+
+    assert semantic_cache._best_match is not semantic_cache._best_match_numpy
+    assert best == expected_best
+    assert score == pytest.approx(expected_score, rel=1e-5)